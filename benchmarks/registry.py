@@ -0,0 +1,90 @@
+"""
+Compare memory and save throughput of the columnar registry with accounts kept as objects (the previous layout).
+
+Usage: python -m benchmarks.registry [--accounts N,...] [--repeat N]
+"""
+from argparse import ArgumentParser
+from collections.abc import Callable
+from configparser import ConfigParser
+from dataclasses import asdict
+from gc import collect
+from io import StringIO
+from time import perf_counter
+from tracemalloc import get_traced_memory
+from tracemalloc import start
+from tracemalloc import stop
+from typing import Any
+
+from benchmarks.suite import generate_registry
+from github_tools.internal.account import Account
+from github_tools.internal.registry import Registry
+
+
+def load_objects(content: str) -> dict[str, Account]:
+    storage = ConfigParser()
+    storage.read_string(content)
+    return {name: Account.create(name, **storage[name]) for name in storage.sections()}
+
+
+def load_columns(content: str) -> Registry:
+    return Registry.load(StringIO(content))
+
+
+def save_objects(accounts: dict[str, Account]) -> None:
+    storage = ConfigParser()
+    for account in accounts.values():
+        storage[account.name] = {
+            field: str(value) for field, value in asdict(account).items() if field != "name" and value
+        }
+    storage.write(StringIO())
+
+
+def save_columns(registry: Registry) -> None:
+    registry.save(StringIO())
+
+
+def traced_size(build: Callable[[], Any]) -> int:
+    """Memory held by the result, the parser is collected before measuring (its sections refer to it in a cycle)."""
+    start()
+    try:
+        result = build()
+        collect()
+        size, _ = get_traced_memory()
+    finally:
+        stop()
+    del result
+    return size
+
+
+def best_time(function: Callable[[], None], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = perf_counter()
+        function()
+        timings.append(perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", default="10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'accounts':>9} {'layout':<8} {'bytes/account':>14} {'save accounts/s':>16}")
+    for count in map(int, args.accounts.split(",")):
+        content = generate_registry(count)
+        objects = load_objects(content)
+        registry = load_columns(content)
+        layouts: list[tuple[str, Callable[[], Any], Callable[[], None]]] = [
+            ("objects", lambda: load_objects(content), lambda: save_objects(objects)),
+            ("columns", lambda: load_columns(content), lambda: save_columns(registry)),
+        ]
+        for layout, build, save in layouts:
+            size = traced_size(build) / count
+            throughput = count / best_time(save, args.repeat)
+            print(f"{count:>9} {layout:<8} {size:>14.0f} {throughput:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Measure how the ssh config audit scales with the number of worker processes.
+
+Usage: python -m benchmarks.ssh_audit [--files N] [--lines N] [--jobs N,...]
+"""
+from argparse import ArgumentParser
+from os import cpu_count
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.ssh_config import generate_config
+from github_tools.internal.ssh_audit import audit_files
+
+
+def main() -> None:
+    cores = cpu_count() or 1
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--jobs", default=",".join(str(1 << power) for power in range(cores.bit_length())))
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp_dir:
+        content = generate_config(args.lines) + "Host github.com\n    IdentityFile ~/.ssh/work\n"
+        paths = []
+        for index in range(args.files):
+            path = Path(temp_dir) / f"config-{index}"
+            path.write_text(content, encoding="utf-8")
+            paths.append(path)
+
+        print(f"{'jobs':>5} {'files/s':>10} {'speedup':>8}")
+        baseline = None
+        for jobs in map(int, args.jobs.split(",")):
+            started = perf_counter()
+            for _ in audit_files(paths, workers=jobs):
+                pass
+            throughput = args.files / (perf_counter() - started)
+            baseline = baseline or throughput
+            print(f"{jobs:>5} {throughput:>10.0f} {throughput / baseline:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare the single-pass SshConfig parser with the original one on synthetic configs.
+
+Usage: python -m benchmarks.ssh_config [--lines N] [--repeat N]
+"""
+from argparse import ArgumentParser
+from collections.abc import Callable
+from io import StringIO
+from time import perf_counter
+from tracemalloc import get_traced_memory
+from tracemalloc import start
+from tracemalloc import stop
+from typing import Any
+from typing import TextIO
+
+from github_tools.internal.ssh_config import SshConfig
+from github_tools.internal.ssh_config import SshKeyword
+
+BLOCK = """
+# generated host {index}
+Host host-{index}.example.com
+    HostName 10.0.{high}.{low}
+    User git
+    Port 22
+    PreferredAuthentications publickey
+    IdentityFile ~/.ssh/keys/host-{index}
+"""
+LINES_PER_BLOCK = BLOCK.count("\n")
+
+
+def generate_config(lines: int) -> str:
+    """Make a config of roughly `lines` lines the original parser can read too."""
+    blocks = max(1, lines // LINES_PER_BLOCK)
+    return "".join(BLOCK.format(index=index, high=index // 256 % 256, low=index % 256) for index in range(blocks))
+
+
+def legacy_parse(file: TextIO) -> dict[str, dict[SshKeyword, str]]:
+    """The parser as it was before the tokenizer: filtering generators and a case-sensitive enum lookup."""
+    hosts: list[tuple[str, dict[SshKeyword, str]]] = []
+    filter_comments = (line.strip() for line in file if not line.startswith("#") and line.strip())
+    for line in filter_comments:
+        option, _, value = line.partition(" ")
+        keyword, value = SshKeyword[option], value.strip('=" ')
+        if keyword is SshKeyword.Host:
+            hosts.append((value, {}))
+        else:
+            hosts[-1][1][keyword] = value
+    return dict(hosts)
+
+
+def measure(parse: Callable[[TextIO], Any], text: str, repeat: int) -> tuple[float, int]:
+    """Return the best parse time and the peak of allocated memory."""
+    best = float("inf")
+    for _ in range(repeat):
+        stream = StringIO(text)
+        started = perf_counter()
+        parse(stream)
+        best = min(best, perf_counter() - started)
+
+    start()
+    parse(StringIO(text))
+    _, peak = get_traced_memory()
+    stop()
+    return best, peak
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = generate_config(args.lines)
+    print(f"config: {text.count(chr(10))} lines, {len(text) / 1024:.0f} KiB")
+    for name, parse in (("legacy", legacy_parse), ("tokenizer", SshConfig)):
+        elapsed, peak = measure(parse, text, args.repeat)
+        print(f"{name:<10} {elapsed * 1000:8.1f} ms  peak {peak / 1024 / 1024:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Time the hot paths on synthetic data and compare the results with a stored baseline.
+
+Usage: python -m benchmarks.suite [--accounts N,...] [--lines N,...] [--repeat N] [--baseline FILE] [--save]
+
+Every case reports the best of `--repeat` runs. With `--save` the results are written to the baseline file, otherwise
+they are compared with it and the run fails if any case got slower than `--tolerance` allows. Timings depend on the
+machine, so the baseline is made on the machine that runs the comparison.
+"""
+from argparse import ArgumentParser
+from collections.abc import Callable
+from collections.abc import Iterator
+from functools import partial
+from io import StringIO
+from json import dumps
+from json import loads
+from multiprocessing import Process
+from pathlib import Path
+from subprocess import DEVNULL
+from subprocess import run
+from sys import executable
+from sys import exit
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.ssh_config import generate_config
+from github_tools.internal.account import Account
+from github_tools.internal.account import AccountRecord
+from github_tools.internal.registry import Registry
+from github_tools.internal.registry_file import RegistryFile
+from github_tools.internal.ssh_config import SshConfig
+from github_tools.internal.symlink import Symlink
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+SWITCHES = 1000
+
+# processes adding accounts to the same registry at once and accounts added by each of them
+WRITERS = 4
+WRITER_MUTATIONS = 100
+
+# case name -> function running the case once
+Cases = dict[str, Callable[[], object]]
+
+
+def generate_accounts(count: int) -> Iterator[Account]:
+    """Make `count` accounts with unique names, cert files and emails, authors are shared."""
+    for index in range(count):
+        name = f"account-{index}"
+        yield Account.create(name, f"/home/user/.ssh/keys/{name}", f"Author {index % 100}", f"{name}@example.com")
+
+
+def generate_registry(count: int) -> str:
+    """Make the ini content of the registry with `count` accounts."""
+    registry = Registry()
+    for account in generate_accounts(count):
+        registry.add(account)
+
+    content = StringIO()
+    registry.save(content)
+    return content.getvalue()
+
+
+def registry_cases(root: Path, counts: list[int]) -> Cases:
+    cases: Cases = {}
+    for count in counts:
+        content = generate_registry(count)
+        registry = Registry.load(StringIO(content))
+        cases[f"registry.load[{count}]"] = partial(_load, content)
+        cases[f"registry.save[{count}]"] = partial(_save, registry)
+
+        storage = RegistryFile(root / f"registry-{count}.cfg")
+        storage.save(registry, force=True)
+        cases[f"registry_file.load[{count}]"] = storage.load
+        cases[f"registry_file.load_cold[{count}]"] = partial(_cold_load, storage)
+
+        compiled = RegistryFile(root / f"compiled-{count}.cfg")
+        compiled.save(registry, force=True)
+        compiled.compile()
+        name = f"account-{count // 2}"
+        cases[f"registry_file.lookup[{count}]"] = partial(compiled.lookup, name=name)
+    return cases
+
+
+def concurrent_cases(root: Path) -> Cases:
+    """Writers serialized by the registry lock, every run starts from an empty registry."""
+
+    def write() -> None:
+        for stale in root.glob("concurrent.cfg*"):
+            stale.unlink()
+        workers = [Process(target=_writer, args=(root / "concurrent.cfg", worker)) for worker in range(WRITERS)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    return {f"registry_file.concurrent[{WRITERS}x{WRITER_MUTATIONS}]": write}
+
+
+def ssh_config_cases(lines: list[int]) -> Cases:
+    cases: Cases = {}
+    for count in lines:
+        text = generate_config(count)
+        cases[f"ssh_config.parse[{count}]"] = partial(_parse, text)
+    return cases
+
+
+def symlink_cases(root: Path) -> Cases:
+    targets = [root / "first", root / "second"]
+    for target in targets:
+        target.touch()
+    link = Symlink.make(path=root / "link", to=targets[0])
+
+    def switch() -> None:
+        for index in range(SWITCHES):
+            link.switch(targets[index % 2])
+
+    return {f"symlink.switch[{SWITCHES}]": switch}
+
+
+def cli_cases(root: Path) -> Cases:
+    config = root / "cli.cfg"
+    storage = RegistryFile(config)
+    for account in generate_accounts(100):
+        storage.add(account)
+
+    options = ["--config", str(config), "--socket", str(root / "missing.sock"), "--link", str(root / "identity")]
+    commands = {
+        "cli.help": ["-m", "github_tools.account_switcher", "--help"],
+        "cli.current": ["-m", "github_tools.account_switcher", *options, "current"],
+        "cli.list": ["-m", "github_tools.account_switcher", *options, "list"],
+    }
+    return {name: partial(_spawn, arguments) for name, arguments in commands.items()}
+
+
+def measure(cases: Cases, repeat: int) -> dict[str, float]:
+    results = {}
+    for name, case in cases.items():
+        best = float("inf")
+        for _ in range(repeat):
+            started = perf_counter()
+            case()
+            best = min(best, perf_counter() - started)
+        results[name] = best
+        print(f"{name:<36} {best * 1000:10.3f} ms", flush=True)
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Print the change of every case present in both runs and return names of the regressed cases."""
+    regressions = []
+    for name, elapsed in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+
+        ratio = elapsed / expected
+        regressed = ratio > 1 + tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<36} {(ratio - 1) * 100:+8.1f} %" + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", type=_sizes, default=[10, 1_000, 100_000], help="Registry sizes.")
+    parser.add_argument("--lines", type=_sizes, default=[10, 1_000, 100_000], help="ssh config sizes.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown, 0.25 is 25%%.")
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline.")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        cases = registry_cases(root, args.accounts)
+        cases.update(concurrent_cases(root))
+        cases.update(ssh_config_cases(args.lines))
+        cases.update(symlink_cases(root))
+        cases.update(cli_cases(root))
+        results = measure(cases, args.repeat)
+
+    if args.save:
+        args.baseline.write_text(dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"baseline saved to {str(args.baseline)!r}")
+        return
+
+    if not args.baseline.is_file():
+        print(f"no baseline at {str(args.baseline)!r}, run with --save to make one")
+        return
+
+    print()
+    regressions = compare(results, loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed")
+        exit(1)
+
+
+def _sizes(value: str) -> list[int]:
+    return [int(size) for size in value.split(",") if size]
+
+
+def _load(content: str) -> Registry:
+    return Registry.load(StringIO(content))
+
+
+def _save(registry: Registry) -> None:
+    registry.save(StringIO())
+
+
+def _parse(text: str) -> SshConfig:
+    return SshConfig(StringIO(text))
+
+
+def _cold_load(storage: RegistryFile) -> list[AccountRecord]:
+    storage.snapshot.unlink(missing_ok=True)
+    return list(storage.load().records())  # rows are parsed lazily, reading all of them makes the load complete
+
+
+def _writer(path: Path, worker: int) -> None:
+    storage = RegistryFile(path, journal_limit=4096)
+    for index in range(WRITER_MUTATIONS):
+        account = Account.create(f"writer-{worker}-{index}", f"/home/user/.ssh/keys/writer-{worker}-{index}")
+        if index % 10:
+            storage.add(account)
+        else:
+            storage.update(lambda registry: registry.add(account))
+
+
+def _spawn(arguments: list[str]) -> None:
+    run([executable, *arguments], cwd=ROOT, stdout=DEVNULL, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Switch the identity symlink while other processes resolve it and count resolutions that failed.
+
+Usage: python -m benchmarks.symlink [--seconds N] [--readers N] [--writers N]
+"""
+from argparse import ArgumentParser
+from multiprocessing import Event
+from multiprocessing import Process
+from multiprocessing import Queue
+from multiprocessing.synchronize import Event as EventType
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from time import sleep
+
+from github_tools.internal.symlink import Symlink
+
+
+def switch(link: Path, targets: list[Path], stopped: EventType, results: "Queue[tuple[str, int, int]]") -> None:
+    symlink = Symlink(link)
+    switches = failures = 0
+    try:
+        while not stopped.is_set():
+            try:
+                symlink.switch(targets[switches % len(targets)])
+            except OSError:
+                failures += 1  # another writer got between unlink and symlink of the non-atomic switch
+            switches += 1
+    finally:
+        results.put(("switch", switches, failures))
+
+
+def resolve(link: Path, stopped: EventType, results: "Queue[tuple[str, int, int]]") -> None:
+    resolutions = failures = 0
+    try:
+        while not stopped.is_set():
+            try:
+                with open(link, "rb"):
+                    pass
+            except OSError:
+                failures += 1
+            resolutions += 1
+    finally:
+        results.put(("resolve", resolutions, failures))
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        targets = [root / f"key-{index}" for index in range(2)]
+        for target in targets:
+            target.write_text(target.name, encoding="utf-8")
+        link = root / "identity"
+        Symlink.make(path=link, to=targets[0])
+
+        stopped = Event()
+        results: "Queue[tuple[str, int, int]]" = Queue()
+        processes = [Process(target=switch, args=(link, targets, stopped, results)) for _ in range(args.writers)]
+        processes += [Process(target=resolve, args=(link, stopped, results)) for _ in range(args.readers)]
+
+        started = perf_counter()
+        for process in processes:
+            process.start()
+        sleep(args.seconds)
+        stopped.set()
+        totals = {"switch": [0, 0], "resolve": [0, 0]}
+        for _ in processes:
+            kind, count, failures = results.get()
+            totals[kind][0] += count
+            totals[kind][1] += failures
+        for process in processes:
+            process.join()
+        elapsed = perf_counter() - started
+
+    switches, failed_switches = totals["switch"]
+    resolutions, failed_resolutions = totals["resolve"]
+    print(f"{args.writers} switching and {args.readers} resolving processes, {elapsed:.1f} s")
+    print(f"switches:    {switches:>9} {switches / elapsed:>9,.0f}/s  failed {failed_switches}")
+    print(f"resolutions: {resolutions:>9} {resolutions / elapsed:>9,.0f}/s  failed {failed_resolutions}")
+
+
+if __name__ == "__main__":
+    main()
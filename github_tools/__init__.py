@@ -0,0 +1,4 @@
+from time import perf_counter
+
+# the moment the package started importing, used by `github-account --startup-timing`
+IMPORT_STARTED = perf_counter()
@@ -0,0 +1,94 @@
+"""
+Thin client for the `github-account serve` daemon.
+
+It doesn't import click or parse any files, so prompt and hook integrations pay only for the interpreter startup.
+Whatever the daemon can't answer is handed over to the full `github-account` CLI. **auto** doesn't need the daemon at
+all: it reads the precompiled bindings trie directly.
+"""
+from os import environ
+from os.path import exists
+from os.path import expanduser
+from sys import argv
+
+# the same as `paths.CONFIG`, `paths.LINK` and `paths.SOCKET`, spelled out so a query doesn't import pathlib
+CONFIG = expanduser("~/.github-tools.cfg")
+LINK = expanduser("~/.ssh/github-identity")
+SOCKET = expanduser("~/.github-tools.sock")
+
+# command -> names of its positional arguments
+QUERIES = {"list": (), "current": (), "check": ("name",), "switch": ("name",)}
+
+
+def query(command: str, arguments: list[str]) -> bool:
+    """Print the daemon answer in the CLI format, **False** means the query has to be answered by the CLI."""
+    names = QUERIES.get(command)
+    if names is None or len(names) != len(arguments):
+        return False
+
+    socket = environ.get("GITHUB_TOOLS_SOCKET", SOCKET)
+    if not exists(socket):
+        return False
+
+    try:
+        from github_tools.internal.daemon_client import request
+    except ImportError:  # no unix sockets on this platform
+        return False
+
+    payload = {"command": command, "config": CONFIG, "link": LINK, **dict(zip(names, arguments))}
+    response = request(socket, payload)
+    if response is None or not response.get("ok"):
+        return False
+
+    result = response["result"]
+    match command:
+        case "list" if not result:
+            print("no accounts")
+        case "list":
+            print("Github Accounts:")
+            for name, cert_file, author, email, key in result:
+                print(f"{name}:\n    cert:   '{cert_file}'\n    key:    {key or 'unknown'}")
+                print(f"    author: {author!r}\n    email:  {email!r}")
+        case "current":
+            print(result or "no active account")
+        case _ if result is None:
+            print("no registered account")
+        case "check" if result[0]:
+            print(f"account ({arguments[0]}) is valid" + (f" ({result[1]})" if result[1] else ""))
+        case "check":
+            print(f"account ({arguments[0]}) is invalid: {result[1]}")
+        case "switch":
+            link, target = result
+            print(f"switched to account ({arguments[0]}): '{link}' -> '{target}'")
+    return True
+
+
+def auto() -> None:
+    """Switch to the account bound to the current directory, the same as `github-account auto` but without click."""
+    from pathlib import Path
+
+    from github_tools.internal import paths
+    from github_tools.internal.bindings import Bindings
+    from github_tools.internal.registry_file import RegistryFile
+
+    try:
+        name = Bindings(RegistryFile(paths.CONFIG)).apply(paths.LINK, Path.cwd())
+    except (OSError, ValueError) as error:
+        print(f"operation failed: {error}")
+        return
+
+    if name is not None:
+        print(f"switched to account ({name})")
+
+
+def main() -> None:
+    command, *arguments = argv[1:] or [""]
+    if command == "auto" and not arguments:
+        auto()
+    elif not query(command, arguments):
+        from github_tools.account_switcher import cli
+
+        cli()
+
+
+if __name__ == "__main__":
+    main()
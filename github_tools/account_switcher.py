@@ -1,88 +1,324 @@
 from dataclasses import dataclass
+from dataclasses import field
+from functools import cached_property
 from pathlib import Path
+from sys import stderr
+from time import perf_counter
+from typing import Any
+from typing import TextIO
+from typing import TYPE_CHECKING
 
 from click import argument
+from click import Choice
 from click import confirm
+from click import Context
 from click import echo
+from click import File
+from click import Group
 from click import group
 from click import option
 from click import pass_context
 from click import pass_obj
 
-from github_tools.internal.account import Account
-from github_tools.internal.registry import Registry
-from github_tools.internal.registry import RegistryError
-from github_tools.internal.ssh_config import SshConfig
+from github_tools import IMPORT_STARTED
+from github_tools.internal import paths
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from github_tools.internal.formatting import Record
+    from github_tools.internal.keys import FingerprintCache
+    from github_tools.internal.registry import Registry
+    from github_tools.internal.registry_file import RegistryFile
 
 
 @dataclass
 class Application:
     config: Path
-    registry: Registry
-
-
-@group()
-@option("--config", type=Path, default=Path.home() / ".github-tools.cfg", show_default=True)
+    link: Path = paths.LINK
+    socket: Path = paths.SOCKET
+    timings: dict[str, float] = field(default_factory=dict)
+
+    @cached_property
+    def storage(self) -> "RegistryFile":
+        from github_tools.internal.registry_file import RegistryFile
+
+        return RegistryFile(self.config)
+
+    @cached_property
+    def fingerprints(self) -> "FingerprintCache":
+        from github_tools.internal.keys import FingerprintCache
+
+        return FingerprintCache(self.storage.fingerprints)
+
+    def describe_key(self, cert_file: Path) -> str:
+        """Return type and fingerprint of the key taken from the cache, it's updated on disk by `save_caches`."""
+        return str(self.fingerprints.get(cert_file) or "")
+
+    def check_key(self, cert_file: Path) -> tuple[bool, str]:
+        """Validate the private key, the details are its description or the reason it's invalid."""
+        from github_tools.internal.keys import inspect_key
+        from github_tools.internal.keys import KeyStatus
+
+        status = inspect_key(cert_file)
+        if status is not KeyStatus.Valid:
+            return False, status.value
+        return True, self.describe_key(cert_file)
+
+    def save_caches(self) -> None:
+        if "fingerprints" in self.__dict__:
+            self.fingerprints.save()
+
+    @cached_property
+    def registry(self) -> "Registry":
+        """Load the registry on first access, so commands that don't need it don't pay for it."""
+        from github_tools.internal.registry import RegistryError
+
+        started = perf_counter()
+        try:
+            registry = self.storage.load()
+        except RegistryError as error:
+            echo(f"can't load accounts: {error.message}")
+            exit(error.code)
+
+        self.timings["registry"] = perf_counter() - started
+        return registry
+
+    def query(self, command: str, **arguments: str) -> dict[str, Any] | None:
+        """Forward the query to the daemon if it's running, **None** means the caller has to do the work itself."""
+        if not self.socket.exists():
+            return None
+
+        try:
+            from github_tools.internal.daemon_client import request
+        except ImportError:  # no unix sockets on this platform
+            return None
+
+        payload = {"command": command, "config": str(self.config), "link": str(self.link), **arguments}
+        response = request(self.socket, payload)
+        if response is None or not response.get("ok"):
+            return None
+        return response
+
+    def report_timings(self) -> None:
+        """Print the collected startup timings to stderr."""
+        for phase, elapsed in self.timings.items():
+            echo(f"{phase + ':':<10} {elapsed * 1000:.3f} ms", file=stderr)
+
+
+class Commands(Group):
+    """Commands of the CLI, accounts are parsed as they're accessed, so any of them may find a malformed one."""
+
+    def invoke(self, ctx: Context) -> Any:
+        try:
+            return super().invoke(ctx)
+        except Exception as error:
+            from github_tools.internal.registry import RegistryError
+
+            if not isinstance(error, RegistryError):
+                raise
+            echo(f"can't load accounts: {error.message}")
+            exit(error.code)
+
+
+@group(cls=Commands)
+@option("--config", type=Path, default=paths.CONFIG, show_default=True)
+@option("--link", type=Path, default=paths.LINK, show_default=True, help="Symlink used as IdentityFile.")
+@option("--socket", type=Path, default=paths.SOCKET, show_default=True, envvar="GITHUB_TOOLS_SOCKET")
+@option("--startup-timing", type=bool, is_flag=True, default=False, help="Report import and load time to stderr.")
+@option(
+    "--profile",
+    metavar="FILE",
+    type=str,
+    envvar="GITHUB_TOOLS_PROFILE",
+    help="Write phase timings and counters as JSON to the file, '-' is stderr.",
+)
 @pass_context
-def cli(ctx: object, config: Path) -> None:
+def cli(ctx: object, config: Path, link: Path, socket: Path, startup_timing: bool, profile: str | None) -> None:
     """
     Allows switching between GitHub accounts in shells.
 
     It's done pretty simply: the application creates or updates a section for **Host github.com** by pointing
     **IdentityFile** to the symbolic link which can be switched to another certificate file with the **switch** command
     """
-    registry = Registry()
-    skip_loading = getattr(ctx, "invoked_subcommand") == "prune"
-    if not skip_loading and config.exists():
-        with open(config, encoding="utf-8") as file:
-            try:
-                registry = Registry.load(file)
-            except RegistryError as error:
-                echo(f"can't load accounts: {error.message}")
-                exit(error.code)
+    app = Application(config, link, socket)
+    if profile:
+        from github_tools.internal import profiling
+
+        profiling.enable(profile).record("imports", perf_counter() - IMPORT_STARTED)
 
-    setattr(ctx, "obj", Application(config, registry))
+    if startup_timing:
+        app.timings["imports"] = perf_counter() - IMPORT_STARTED
+        getattr(ctx, "call_on_close")(app.report_timings)
+
+    setattr(ctx, "obj", app)
 
 
 @cli.command(short_help="drop accounts")
 @pass_obj
 def prune(app: Application) -> None:
     """Simply delete config file."""
-    app.config.unlink(missing_ok=True)
+    app.storage.drop()
     echo("all accounts were dropped")
 
 
 @cli.command(name="check-ssh", short_help="check ssh config")
-def check_ssh_config() -> None:
-    """Check ~/.ssh/config for GitHub host entry."""
-    config_path = Path.home() / ".ssh" / "config"
-    if not config_path.is_file():
-        echo("ssh config file (~/.ssh/config) is missing")
+@option("--paths", "config_paths", type=Path, multiple=True, help="Audit these configs instead of ~/.ssh/config.")
+@option(
+    "--glob", "patterns", type=str, multiple=True, help="Audit configs matching the glob, e.g. '/home/*/.ssh/config'."
+)
+@option("--jobs", type=int, help="Parallel processes of the audit.  [default: number of CPUs]")
+@pass_obj
+def check_ssh_config(
+    app: Application, config_paths: tuple[Path, ...], patterns: tuple[str, ...], jobs: int | None
+) -> None:
+    """
+    Check ~/.ssh/config for GitHub host entry.
 
-    with open(config_path, encoding="utf-8") as file:
-        ssh_config = SshConfig(file)
+    With **--paths** or **--glob** the configs are audited in parallel processes instead: a JSON line per config is
+    printed to stdout as results come, followed by a summary of invalid configs and configs with conflicting
+    **IdentityFile** directives for github.com on stderr. The exit code is 1 if any were found.
+    """
+    if config_paths or patterns:
+        audit_ssh_configs(config_paths, patterns, jobs)
+        return
 
-    status = "valid" if ssh_config.is_valid() else "corrupted"
+    config_path = paths.SSH_CONFIG
+    response = app.query("check_ssh", ssh_config=str(config_path))
+    if response is not None and response["result"] is not None:
+        valid, contains_github = response["result"]["valid"], response["result"]["github"]
+    else:
+        from github_tools.internal.ssh_config import SshConfig
+        from github_tools.internal.ssh_config import SshConfigError
+
+        if not config_path.is_file():
+            echo("ssh config file (~/.ssh/config) is missing")
+            return
+
+        try:
+            ssh_config = SshConfig.from_path(config_path)
+        except SshConfigError as error:
+            echo(f"ssh config is corrupted: {error.message}")
+            return
+        valid, contains_github = ssh_config.is_valid(), "github.com" in ssh_config
+
+    status = "valid" if valid else "corrupted"
     print(f"ssh config is {status}")
 
-    status = "contains" if "github.com" in ssh_config else "doesn't contain"
+    status = "contains" if contains_github else "doesn't contain"
     print(f"ssh config {status} 'github.com' entry")
 
 
+def audit_ssh_configs(config_paths: tuple[Path, ...], patterns: tuple[str, ...], jobs: int | None) -> None:
+    """Stream audit results as JSON Lines, configs matched by several globs or paths are audited once."""
+    from glob import glob
+    from json import dumps
+    from os.path import expanduser
+    from sys import stdout
+
+    from github_tools.internal.ssh_audit import audit_files
+    from github_tools.internal.ssh_audit import AuditResult
+    from github_tools.internal.ssh_audit import DEFAULT_WORKERS
+
+    candidates = [str(path) for path in config_paths]
+    for pattern in patterns:
+        candidates.extend(sorted(glob(expanduser(pattern), recursive=True)))
+
+    audited = github = 0
+    invalid: list[AuditResult] = []
+    conflicting: list[AuditResult] = []
+    for result in audit_files(dict.fromkeys(candidates), workers=jobs or DEFAULT_WORKERS):
+        stdout.write(dumps(result.to_json()) + "\n")
+        stdout.flush()
+        audited += 1
+        github += result.github
+        if not result.valid:
+            invalid.append(result)
+        if result.conflicting:
+            conflicting.append(result)
+
+    echo(
+        f"audited {audited} ssh config(s): {len(invalid)} invalid, {github} with 'github.com' entry, "
+        f"{len(conflicting)} with conflicting IdentityFile",
+        err=True,
+    )
+    for result in invalid:
+        echo(f"invalid ({result.path}): {result.error}", err=True)
+    for result in conflicting:
+        echo(f"conflicting IdentityFile ({result.path}): {', '.join(result.identity_files)}", err=True)
+    if invalid or conflicting:
+        exit(1)
+
+
+@cli.command(name="setup-ssh", short_help="point ssh config to the symlink")
+@pass_obj
+def setup_ssh_config(app: Application) -> None:
+    """
+    Create or update **Host github.com** in ~/.ssh/config, so **IdentityFile** points to the symlink.
+
+    Only the affected line is touched, the rest of the file is kept byte for byte.
+    """
+    from github_tools.internal.ssh_config import SshKeyword
+    from github_tools.internal.ssh_config_document import SshConfigDocument
+
+    link = app.link.expanduser().absolute()
+    if link.is_relative_to(Path.home()):
+        link = Path("~") / link.relative_to(Path.home())
+
+    try:
+        document = SshConfigDocument.read(paths.SSH_CONFIG)
+        document.set("github.com", SshKeyword.IdentityFile, link.as_posix())
+        updated = document.write(paths.SSH_CONFIG)
+    except OSError as error:
+        echo(f"operation failed: {error.strerror}")
+        return
+
+    echo("ssh config was updated" if updated else "ssh config is up to date")
+
+
 @cli.command(name="list", short_help="list accounts")
+@option("--format", "output_format", type=Choice(["text", "json", "jsonl", "tsv"]), default="text", show_default=True)
+@option(
+    "--fields", type=str, help="Comma-separated fields for json, jsonl and tsv.  [default: name,cert_file,author,email]"
+)
+@option("--name", "pattern", type=str, help="Only accounts with names matching the glob.")
 @pass_obj
-def list_accounts(app: Application) -> None:
-    """Print list of all registered accounts."""
-    if not app.registry.accounts:
-        echo("no accounts")
+def list_accounts(app: Application, output_format: str, fields: str | None, pattern: str | None) -> None:
+    """Print list of all registered accounts, the machine-readable formats are streamed as accounts are read."""
+    from fnmatch import translate
+    from re import compile
+    from sys import stdout
+
+    from github_tools.internal.formatting import FIELDS
+    from github_tools.internal.formatting import write_records
+
+    selected = fields.split(",") if fields else [field for field in FIELDS if field != "key"]
+    if output_format == "text":
+        selected = list(FIELDS)
+    unknown = [field for field in selected if field not in FIELDS]
+    if unknown:
+        echo(f"unknown field(s): {', '.join(unknown)}, use: {','.join(FIELDS)}")
         return
 
-    echo("Github Accounts:")
-    for account in app.registry.accounts:
-        echo(f"{account.name}:")
-        echo(f"    cert:   '{account.cert_file}'")
-        echo(f"    author: {account.author!r}")
-        echo(f"    email:  {account.email!r}")
+    matches = compile(translate(pattern)).match if pattern else None
+    response = app.query("list")
+    records: Iterable[Record]
+    if response is not None:
+        records = (
+            (name, cert_file, author, email, key)
+            for name, cert_file, author, email, key in response["result"]
+            if not matches or matches(name)
+        )
+    else:
+        with_keys = "key" in selected
+        records = (
+            (*record, app.describe_key(Path(record[1])) if with_keys else "")
+            for record in app.registry.records()
+            if not matches or matches(record[0])
+        )
+
+    write_records(stdout, records, selected, output_format)
+    app.save_caches()
 
 
 @cli.command(name="add", short_help="add account")
@@ -93,17 +329,21 @@ def list_accounts(app: Application) -> None:
 @pass_obj
 def add_account(app: Application, name: str, cert_path: Path, author: str, email: str) -> None:
     """Add/update account to registry."""
+    from github_tools.internal.account import Account
+    from github_tools.internal.keys import inspect_key
+    from github_tools.internal.keys import KeyStatus
+
     try:
         account = Account.create(name, cert_path, author, email)
-        if not account.is_valid():
-            if not confirm("account is invalid. add anyway?"):
+        status = inspect_key(account.cert_file)
+        if not account.is_valid() or status is not KeyStatus.Valid:
+            if not confirm(f"account is invalid ({status.value}). add anyway?"):
                 return
 
+        action = "updated" if name in app.registry else "added"
         app.registry.add(account, rewrite=True)
-        with open(app.config, "w", encoding="utf-8") as file:
-            app.registry.save(file)
+        app.storage.add(account)
 
-        action = "updated" if name in app.registry else "added"
         echo(f"operation succeeded: account was {action}")
     except OSError as error:
         echo(f"operation failed: {error.strerror}")
@@ -120,41 +360,399 @@ def remove_account(app: Application, name: str) -> None:
 
     try:
         app.registry.remove(name)
-        with open(app.config, "w", encoding="utf-8") as file:
-            app.registry.save(file)
+        app.storage.remove(name)
 
         echo("operation succeeded: account was removed")
     except OSError as error:
         echo(f"operation failed: {error.strerror}")
 
 
+@cli.command(name="find", short_help="find accounts")
+@option("--email", type=str, help="Case-insensitive.")
+@option("--author", type=str)
+@option("--cert", "cert_file", type=str, help="Matched after resolving symlinks.")
+@pass_obj
+def find_accounts(app: Application, email: str | None, author: str | None, cert_file: str | None) -> None:
+    """Print names of accounts matching all given fields, one per line."""
+    criteria = {
+        field: value for field, value in (("email", email), ("author", author), ("cert_file", cert_file)) if value
+    }
+    if not criteria:
+        echo("--email, --author or --cert is required")
+        return
+
+    response = app.query("find", **criteria)
+    if response is not None:
+        names = response["result"]
+    else:
+        found = app.storage.lookup(**criteria) if "author" not in criteria else None
+        if found is None:
+            found = app.registry.find(**criteria)
+        names = [account.name for account in found]
+
+    if not names:
+        echo("no registered account")
+        return
+
+    for name in names:
+        echo(name)
+
+
+@cli.command(name="compile", short_help="compile registry for fast lookups")
+@option("--remove", is_flag=True, default=False, help="Remove the compiled registry.")
+@pass_obj
+def compile_registry(app: Application, remove: bool) -> None:
+    """
+    Make the compiled registry, it's regenerated by every save from now on.
+
+    Without the daemon **find** and **switch** search it in place instead of loading all accounts.
+    """
+    from github_tools.internal.registry import RegistryError
+
+    try:
+        if remove:
+            app.storage.uncompile()
+            echo("operation succeeded: compiled registry was removed")
+        else:
+            app.storage.compile()
+            echo(f"operation succeeded: registry was compiled to '{app.storage.compiled}'")
+    except RegistryError as error:
+        echo(f"operation failed: {error.message}")
+    except OSError as error:
+        echo(f"operation failed: {error.strerror}")
+
+
 @cli.command(name="switch", short_help="switch account")
 @argument("name", type=str)
-def switch_to_account(name: str) -> None:
+@pass_obj
+def switch_to_account(app: Application, name: str) -> None:
     """Switch to account if exists."""
-    echo(f"switch to account - {name}")
+    response = app.query("switch", name=name)
+    if response is not None:
+        target = response["result"] and response["result"][1]
+    else:
+        from github_tools.internal.symlink import Symlink
+
+        found = app.storage.lookup(name=name)
+        account = app.registry.get(name) if found is None else next(iter(found), None)
+        try:
+            target = account and str(Symlink.point(app.link, account.cert_file).target)
+        except (OSError, ValueError) as error:
+            echo(f"operation failed: {error}")
+            return
+
+    if target is None:
+        echo("no registered account")
+        return
 
+    echo(f"switched to account ({name}): '{app.link}' -> '{target}'")
 
-@cli.command(name="check", short_help="check account")
+
+@cli.command(name="current", short_help="show active account")
+@pass_obj
+def current_account(app: Application) -> None:
+    """Print the account the symlink points to."""
+    response = app.query("current")
+    if response is not None:
+        name = response["result"]
+    else:
+        name = None
+        if app.link.is_symlink():
+            target = app.link.resolve()
+            name = next(
+                (account.name for account in app.registry.accounts if account.cert_file.resolve() == target), None
+            )
+
+    echo(name or "no active account")
+
+
+@cli.command(name="bind", short_help="bind directory to account")
 @argument("name", type=str)
+@argument("directory", type=Path, required=False)
+@pass_obj
+def bind_directory(app: Application, name: str, directory: Path | None) -> None:
+    """Bind the directory tree (the current directory by default) to the account for **auto**."""
+    from github_tools.internal.bindings import Bindings
+
+    if name not in app.registry:
+        echo("no registered account")
+        return
+
+    try:
+        Bindings(app.storage).bind(directory or Path.cwd(), name)
+    except OSError as error:
+        echo(f"operation failed: {error.strerror}")
+        return
+
+    echo("operation succeeded: directory was bound")
+
+
+@cli.command(name="unbind", short_help="unbind directory")
+@argument("directory", type=Path, required=False)
+@pass_obj
+def unbind_directory(app: Application, directory: Path | None) -> None:
+    """Remove the binding of the directory (the current directory by default)."""
+    from github_tools.internal.bindings import Bindings
+
+    try:
+        removed = Bindings(app.storage).unbind(directory or Path.cwd())
+    except OSError as error:
+        echo(f"operation failed: {error.strerror}")
+        return
+
+    echo("operation succeeded: directory was unbound" if removed else "no bound directory")
+
+
+@cli.command(name="auto", short_help="switch to account bound to directory")
+@argument("directory", type=Path, required=False)
+@pass_obj
+def auto_switch(app: Application, directory: Path | None) -> None:
+    """
+    Switch to the account bound to the directory (the current one by default), meant for shell prompt hooks.
+
+    Nothing is printed and the symlink isn't touched unless the bound account differs from the active one.
+    """
+    from github_tools.internal.bindings import Bindings
+
+    try:
+        name = Bindings(app.storage).apply(app.link, directory or Path.cwd())
+    except (OSError, ValueError) as error:
+        echo(f"operation failed: {error}")
+        return
+
+    if name is not None:
+        echo(f"switched to account ({name})")
+
+
+@cli.command(name="check", short_help="check account")
+@argument("name", type=str, required=False)
+@option("--all", "check_all", type=bool, is_flag=True, default=False, help="Check every registered account.")
 @option("--remove", type=bool, is_flag=True, default=False)
+@option("--jobs", type=int, default=16, show_default=True, help="Parallel checks for --all.")
+@option("--timeout", type=float, default=5.0, show_default=True, help="Seconds to wait for a single check.")
 @pass_obj
-def validate_account(app: Application, name: str, remove: bool) -> None:
+def validate_account(
+    app: Application, name: str | None, check_all: bool, remove: bool, jobs: int, timeout: float
+) -> None:
     """Validate accounts and delete invalid if *remove* is set to **True**."""
-    account = app.registry.get(name)
-    if not account:
+    if check_all:
+        validate_all_accounts(app, remove, jobs, timeout)
+        return
+
+    if name is None:
+        echo("account name or --all is required")
+        return
+
+    response = None if remove else app.query("check", name=name)
+    if response is not None:
+        valid, details = response["result"] or (None, "")
+    else:
+        account = app.registry.get(name)
+        valid, details = app.check_key(account.cert_file) if account else (None, "")
+        app.save_caches()
+
+    if valid is None:
         echo("no registered account")
         return
 
-    if account.is_valid():
-        echo(f"account ({name}) is valid")
+    if valid:
+        echo(f"account ({name}) is valid" + (f" ({details})" if details else ""))
         return
 
-    echo(f"account ({name}) is invalid")
+    echo(f"account ({name}) is invalid: {details}")
     if remove and confirm("confirm delete", prompt_suffix="? "):
-        app.registry.remove(account)
-        with open(app.config, "w", encoding="utf-8") as file:
-            app.registry.save(file)
+        app.registry.remove(name)
+        app.storage.remove(name)
+
+
+def validate_all_accounts(app: Application, remove: bool, jobs: int, timeout: float) -> None:
+    """Check all accounts in parallel printing results as they come, invalid ones are removed with a single save."""
+    from github_tools.internal.account import Account
+    from github_tools.internal.registry import Registry
+    from github_tools.internal.validation import check_accounts
+
+    def check(account: Account) -> tuple[bool, str]:
+        return app.check_key(account.cert_file)
+
+    invalid = []
+    for account, result in check_accounts(app.registry.accounts, check, workers=jobs, timeout=timeout):
+        valid, details = result or (None, "")
+        if valid is None:
+            echo(f"account ({account.name}) is timed out")
+        elif valid:
+            echo(f"account ({account.name}) is valid" + (f" ({details})" if details else ""))
+        else:
+            echo(f"account ({account.name}) is invalid: {details}")
+        if valid is False:
+            invalid.append(account.name)
+    app.save_caches()
+
+    if not remove or not invalid:
+        return
+
+    if not confirm(f"confirm delete {len(invalid)} account(s)", prompt_suffix="? "):
+        return
+
+    def remove_invalid(registry: Registry) -> None:
+        for name in invalid:
+            registry.remove(name)
+
+    try:
+        app.storage.update(remove_invalid)
+    except OSError as error:
+        echo(f"operation failed: {error.strerror}")
+        return
+
+    echo(f"operation succeeded: {len(invalid)} account(s) removed")
+
+
+@cli.command(name="batch", short_help="apply many changes at once")
+@argument("source", type=File(encoding="utf-8"), default="-")
+@option("--force", type=bool, is_flag=True, default=False, help="Accept accounts with invalid keys.")
+@option("--jobs", type=int, default=16, show_default=True, help="Parallel key checks.")
+@pass_obj
+def batch(app: Application, source: TextIO, force: bool, jobs: int) -> None:
+    """
+    Apply **add**, **remove** and **check** operations read from the file (stdin by default), one per line.
+
+    The lines use the syntax of the commands, e.g. `add work ~/.ssh/work --email me@work.com`. The registry is loaded
+    and saved once; if any operation fails or any key is invalid nothing is saved.
+    """
+    from github_tools.internal.batch import apply_operations
+    from github_tools.internal.batch import BatchError
+    from github_tools.internal.batch import parse_operations
+    from github_tools.internal.registry import RegistryError
+
+    try:
+        operations = parse_operations(source)
+        counts = app.storage.update(lambda registry: apply_operations(registry, operations, force, jobs))
+    except BatchError as error:
+        echo(f"operation failed: line {error.line}: {error.message}")
+        echo("nothing was changed")
+        return
+    except RegistryError as error:
+        echo(f"operation failed: {error.message}")
+        return
+    except OSError as error:
+        echo(f"operation failed: {error.strerror}")
+        return
+
+    summary = ", ".join(f"{count} {command}" for command, count in counts.items())
+    echo(f"operation succeeded: {len(operations)} operation(s) applied ({summary})")
+
+
+@cli.command(name="import", short_help="import accounts")
+@argument("source", type=File(encoding="utf-8", lazy=True), required=False)
+@option("--format", "source_format", type=Choice(["csv", "jsonl"]), help="Format of SOURCE, taken from its suffix.")
+@option("--keys", type=str, help="Glob of private keys to import, e.g. '~/.ssh/id_*'.  [default: ~/.ssh/*]")
+@option("--jobs", type=int, default=16, show_default=True, help="Parallel key checks.")
+@option("--timeout", type=float, default=5.0, show_default=True, help="Seconds to wait for a single check.")
+@pass_obj
+def import_accounts(
+    app: Application, source: TextIO | None, source_format: str | None, keys: str | None, jobs: int, timeout: float
+) -> None:
+    """
+    Import accounts from the CSV or JSON Lines file (*name*, *cert_file*, *author*, *email* fields) or from keys.
+
+    Without SOURCE private keys matching **--keys** are imported under their file names. Records are streamed, keys are
+    validated in parallel, accounts already registered by name or key are skipped and the registry is saved once. A
+    malformed record aborts the import without saving anything.
+    """
+    from github_tools.internal.account import Account
+    from github_tools.internal.importer import import_accounts as import_records
+    from github_tools.internal.importer import read_csv
+    from github_tools.internal.importer import read_jsonl
+    from github_tools.internal.importer import read_key_files
+    from github_tools.internal.importer import SourceError
+    from github_tools.internal.registry import RegistryError
+
+    if source is not None and keys is not None:
+        echo("SOURCE and --keys are mutually exclusive")
+        return
+
+    if source is not None:
+        source_format = source_format or Path(source.name).suffix.removeprefix(".")
+        if source_format not in ("csv", "jsonl"):
+            echo("--format is required")
+            return
+        records = read_csv(source) if source_format == "csv" else read_jsonl(source)
+    else:
+        records = read_key_files(keys or "~/.ssh/*", app.link)
+
+    def report(account: Account, reason: str) -> None:
+        echo(f"skipped ({account.name}): {reason}")
+
+    def run(registry: "Registry") -> dict[str, int]:
+        return import_records(registry, records, report, scanning=source is None, workers=jobs, timeout=timeout)
+
+    try:
+        counts = app.storage.update(run)
+    except SourceError as error:
+        echo(f"operation failed: line {error.line}: {error.message}")
+        echo("nothing was changed")
+        return
+    except RegistryError as error:
+        echo(f"operation failed: {error.message}")
+        return
+    except OSError as error:
+        echo(f"operation failed: {error.strerror}")
+        return
+
+    summary = ", ".join(f"{count} {outcome}" for outcome, count in counts.items() if count)
+    echo(f"operation succeeded: {summary or 'nothing to import'}")
+
+
+@cli.command(name="watch", short_help="watch files and react to changes")
+@option("--ssh-config", type=Path, default=paths.SSH_CONFIG, show_default=True)
+@option("--repair/--no-repair", default=True, show_default=True, help="Repair the dangling identity link.")
+@option("--poll", type=bool, is_flag=True, default=False, help="Poll files instead of using inotify.")
+@option("--interval", type=float, default=1.0, show_default=True, help="Seconds between polls.")
+@pass_obj
+def watch(app: Application, ssh_config: Path, repair: bool, poll: bool, interval: float) -> None:
+    """
+    Watch the registry, cert files, the identity link and the ssh config, report problems as they appear.
+
+    Only what the changed files affect is validated again. The identity link is pointed back to the last active account
+    once it's dangling, caches of the registry are rebuilt as soon as they go out of date.
+    """
+    from github_tools.internal.watch import create_watcher
+    from github_tools.internal.watch import InotifyWatcher
+    from github_tools.internal.watch import Monitor
+
+    monitor = Monitor(app.config, app.link, ssh_config, echo, repair)
+    watcher = create_watcher(poll, interval)
+    echo(f"watching {str(app.config)!r} with {'inotify' if isinstance(watcher, InotifyWatcher) else 'polling'}")
+    try:
+        monitor.start()
+        while True:
+            watcher.watch(monitor.paths())
+            monitor.handle(watcher.wait())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+@cli.command(name="serve", short_help="run daemon")
+@option("--ssh-config", type=Path, default=paths.SSH_CONFIG, show_default=True)
+@pass_obj
+def serve(app: Application, ssh_config: Path) -> None:
+    """
+    Keep the registry and the ssh config in memory and answer queries over the unix socket.
+
+    While the daemon is running **list**, **check**, **switch**, **current** and **check-ssh** are forwarded to it.
+    """
+    from github_tools.internal.daemon import DaemonError
+    from github_tools.internal.daemon import serve as serve_forever
+    from github_tools.internal.daemon import Service
+
+    echo(f"serving {str(app.config)!r} on {str(app.socket)!r}")
+    try:
+        serve_forever(app.socket, Service(app.config, app.link, ssh_config))
+    except DaemonError as error:
+        echo(f"operation failed: {error.message}")
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
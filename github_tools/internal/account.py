@@ -4,6 +4,9 @@ from os import PathLike
 from pathlib import Path
 from typing import Self
 
+# plain form of an account: (name, cert_file, author, email)
+AccountRecord = tuple[str, str, str, str]
+
 
 @dataclass(frozen=True, kw_only=True, slots=True)
 class Account:
@@ -0,0 +1,83 @@
+"""Atomic file replacement."""
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from contextlib import contextmanager
+from os import chmod
+from os import fsync
+from os import getpid
+from os import PathLike
+from os import replace
+from pathlib import Path
+from stat import S_IMODE
+from threading import get_ident
+from typing import Any
+from typing import BinaryIO
+from typing import IO
+from typing import Literal
+from typing import overload
+from typing import TextIO
+
+
+@overload
+def atomic_write(
+    path: str | PathLike[str], binary: Literal[False] = False, sync: bool = True
+) -> AbstractContextManager[TextIO]:
+    ...
+
+
+@overload
+def atomic_write(
+    path: str | PathLike[str], binary: Literal[True], sync: bool = True
+) -> AbstractContextManager[BinaryIO]:
+    ...
+
+
+def atomic_write(path: str | PathLike[str], binary: bool = False, sync: bool = True) -> AbstractContextManager[Any]:
+    """
+    Open a temporary file next to `path` and rename it over `path` once the block succeeds.
+
+    Readers see either the old content or the new one, never a partially written file. With `sync` the data is flushed
+    to the disk before the rename, so the replacement survives a crash too. Permissions of the replaced file are kept
+    (ssh refuses configs writable by others).
+    """
+    return _replace_on_success(Path(path), binary, sync)
+
+
+@contextmanager
+def _replace_on_success(location: Path, binary: bool, sync: bool) -> Iterator[IO[Any]]:
+    temp = _temp_path(location)
+    try:
+        with open(temp, "wb" if binary else "w", encoding=None if binary else "utf-8") as file:
+            yield file
+            if sync:
+                file.flush()
+                fsync(file.fileno())
+
+        try:
+            chmod(temp, S_IMODE(location.stat().st_mode))
+        except FileNotFoundError:
+            pass
+        replace(temp, location)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+
+
+def atomic_symlink(path: str | PathLike[str], target: str | PathLike[str]) -> None:
+    """
+    Create a symlink to `target` next to `path` and rename it over `path`.
+
+    The rename replaces an existing link in a single step, so the path never goes missing for a concurrent reader.
+    """
+    location = Path(path)
+    temp = _temp_path(location)
+    try:
+        temp.symlink_to(Path(target), target_is_directory=False)
+        replace(temp, location)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+
+
+def _temp_path(location: Path) -> Path:
+    return location.with_name(f".{location.name}.{getpid()}.{get_ident()}.tmp")
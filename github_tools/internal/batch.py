@@ -0,0 +1,132 @@
+"""Registry changes applied as a single transaction."""
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from shlex import split
+
+from github_tools.internal.account import Account
+from github_tools.internal.keys import inspect_key
+from github_tools.internal.keys import KeyStatus
+from github_tools.internal.registry import Registry
+from github_tools.internal.validation import check_accounts
+
+USAGE = {
+    "add": "add NAME CERT_PATH [--author AUTHOR] [--email EMAIL]",
+    "remove": "remove NAME",
+    "check": "check NAME",
+}
+
+
+class BatchError(Exception):
+    """
+    Exception raised for a failed batch operation.
+
+    Attributes:
+        line    -- number of the line with the operation
+        message -- explanation of the error
+    """
+
+    def __init__(self, line: int, message: str):
+        self.line = line
+        self.message = message
+        super().__init__(f"line {line}: {message}")
+
+
+@dataclass(frozen=True, slots=True)
+class Operation:
+    line: int
+    command: str
+    name: str
+    account: Account | None = None  # the account to add
+
+
+def parse_operations(lines: Iterable[str]) -> list[Operation]:
+    """
+    Parse operations, one per line in the shell syntax of the matching commands (see `USAGE`).
+
+    Blank lines and lines starting with **#** are skipped.
+    """
+    operations = []
+    for number, line in enumerate(lines, 1):
+        try:
+            words = split(line, comments=True)
+        except ValueError as error:
+            raise BatchError(number, str(error))
+
+        if words:
+            operations.append(_parse_operation(number, words))
+    return operations
+
+
+def apply_operations(
+    registry: Registry, operations: Iterable[Operation], force: bool = False, workers: int = 16
+) -> dict[str, int]:
+    """
+    Apply operations to the registry in order and validate the keys of the added and checked accounts in parallel.
+
+    The first failure raises `BatchError`, leaving the registry partially changed: the caller is expected to discard it,
+    so nothing is saved. Invalid keys of added accounts are accepted if `force` is set. Returns the number of applied
+    operations by command.
+    """
+    counts = dict.fromkeys(USAGE, 0)
+    validated: dict[Account, Operation] = {}
+    for operation in operations:
+        match operation:
+            case Operation(command="add", account=Account() as account):
+                registry.add(account, rewrite=True)
+                if not force:
+                    validated.setdefault(account, operation)
+            case Operation(command="remove"):
+                if not registry.remove(operation.name):
+                    raise BatchError(operation.line, f"no registered account ({operation.name})")
+            case Operation(command="check"):
+                checked = registry.get(operation.name)
+                if checked is None:
+                    raise BatchError(operation.line, f"no registered account ({operation.name})")
+                validated.setdefault(checked, operation)
+        counts[operation.command] += 1
+
+    # added accounts replaced or removed later in the batch don't end up in the registry
+    validated = {
+        account: operation
+        for account, operation in validated.items()
+        if operation.command == "check" or registry.get(account.name) == account
+    }
+
+    failures = []
+    for account, status in check_accounts(validated, lambda account: inspect_key(account.cert_file), workers):
+        if status is not KeyStatus.Valid:
+            operation = validated[account]
+            reason = status.value if status is not None else "check timed out"
+            failures.append(BatchError(operation.line, f"account ({account.name}) is invalid: {reason}"))
+
+    if failures:
+        raise min(failures, key=lambda error: error.line)
+    return counts
+
+
+def _parse_operation(line: int, words: list[str]) -> Operation:
+    command, *arguments = words
+    if command not in USAGE:
+        raise BatchError(line, f"unknown operation ({command})")
+
+    options = {}
+    positional = []
+    iterator = iter(arguments)
+    for argument in iterator:
+        if command == "add" and argument in ("--author", "--email"):
+            value = next(iterator, None)
+            if value is None:
+                raise BatchError(line, f"{argument} requires a value")
+            options[argument.removeprefix("--")] = value
+        else:
+            positional.append(argument)
+
+    expected = 2 if command == "add" else 1
+    if len(positional) != expected:
+        raise BatchError(line, f"usage: {USAGE[command]}")
+
+    if command == "add":
+        name, cert_file = positional
+        return Operation(line, command, name, Account.create(name, Path(cert_file).expanduser(), **options))
+    return Operation(line, command, positional[0])
@@ -0,0 +1,168 @@
+"""Accounts bound to directory trees."""
+from marshal import dumps
+from marshal import loads
+from os import PathLike
+from os import readlink
+from pathlib import Path
+from typing import Any
+
+from github_tools.internal import profiling
+from github_tools.internal.atomic import atomic_write
+from github_tools.internal.filestat import file_key
+from github_tools.internal.filestat import FileKey
+from github_tools.internal.registry import Registry
+from github_tools.internal.registry_file import RegistryFile
+from github_tools.internal.symlink import Symlink
+
+TRIE_VERSION = 1
+
+# key of the trie node holding the account bound to the directory, it can't be a file name
+ACCOUNT = "\0"
+
+# path component -> nested trie, ACCOUNT -> (account name, resolved cert file or "" if it isn't registered)
+Trie = dict[str, Any]
+
+# directory -> account name
+Rules = dict[str, str]
+
+# (account name, resolved cert file)
+Binding = tuple[str, str]
+
+
+class Bindings:
+    """
+    Directories bound to accounts.
+
+    Rules are kept as `<account>\\t<directory>` lines in *<registry>.bindings*. Lookups don't read them: they use the
+    path-prefix trie compiled into *<registry>.bindings.trie*, so a lookup walks the components of the path and its cost
+    depends on the depth of the path, not on the number of rules. Cert files of the bound accounts are stored in the
+    trie too, so the trie is keyed by the identity of the rules and the registry files and is compiled again once any of
+    them changes.
+    """
+
+    def __init__(self, storage: RegistryFile) -> None:
+        self._storage = storage
+
+    @property
+    def path(self) -> Path:
+        return self._storage.bindings
+
+    @property
+    def trie(self) -> Path:
+        return self._storage.bindings_trie
+
+    def rules(self) -> Rules:
+        """Read the rules, a missing file means there are none."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                lines = file.read().splitlines()
+        except FileNotFoundError:
+            return {}
+
+        rules = {}
+        for line in lines:
+            name, separator, directory = line.partition("\t")
+            if separator:
+                rules[directory] = name
+        return rules
+
+    def bind(self, directory: str | PathLike[str], name: str) -> None:
+        """Bind the directory tree to the account, nested bindings take precedence."""
+        with self._storage.lock:
+            rules = self.rules()
+            rules[self._normalize(directory)] = name
+            self._write(rules)
+
+    def unbind(self, directory: str | PathLike[str]) -> bool:
+        """Remove the binding of exactly this directory, returns **False** if there is none."""
+        with self._storage.lock:
+            rules = self.rules()
+            if rules.pop(self._normalize(directory), None) is None:
+                return False
+            self._write(rules)
+            return True
+
+    def lookup(self, path: str | PathLike[str]) -> Binding | None:
+        """
+        Find the account bound to the deepest directory containing `path`.
+
+        The path is resolved the same way bound directories are, so symlinked checkouts and `..` components match too.
+        """
+        with profiling.phase("bindings.lookup"):
+            node = self._load_trie()
+            found: Binding | None = node.get(ACCOUNT)
+            for part in Path(self._normalize(path)).parts:
+                child: Trie | None = node.get(part)
+                if child is None:
+                    break
+                node = child
+                found = node.get(ACCOUNT, found)
+            return found
+
+    def apply(self, link: str | PathLike[str], path: str | PathLike[str]) -> str | None:
+        """
+        Point the link to the account bound to `path`, returns its name if the link was changed.
+
+        The link is left alone if nothing is bound to the path or if it already points to the bound account, so the
+        usual call costs a few `stat` calls, reading the trie and a `readlink`.
+        """
+        binding = self.lookup(path)
+        if binding is None or not binding[1]:
+            return None
+
+        name, cert_file = binding
+        try:
+            if readlink(link) == cert_file:
+                return None
+        except OSError:
+            pass
+
+        Symlink.point(link, cert_file)
+        return name
+
+    def compile(self, registry: Registry | None = None) -> Trie:
+        """Build the trie from the rules and store it, failures to store it are ignored as it's just a cache."""
+        key = self._key()
+        trie = self._build(self.rules(), registry if registry is not None else self._storage.load())
+        try:
+            with atomic_write(self.trie, binary=True, sync=False) as file:
+                file.write(dumps((TRIE_VERSION, key, trie)))
+        except OSError:
+            pass
+        return trie
+
+    def _load_trie(self) -> Trie:
+        try:
+            with open(self.trie, "rb") as file:
+                version, key, trie = loads(file.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return self.compile()
+
+        if version != TRIE_VERSION or key != self._key():
+            return self.compile()
+        return trie  # type: ignore[no-any-return]
+
+    def _key(self) -> tuple[FileKey | None, ...]:
+        return file_key(self.path), file_key(self._storage.path), file_key(self._storage.journal)
+
+    def _write(self, rules: Rules) -> None:
+        with atomic_write(self.path) as file:
+            for directory, name in sorted(rules.items()):
+                file.write(f"{name}\t{directory}\n")
+        self.compile()
+
+    @staticmethod
+    def _normalize(directory: str | PathLike[str]) -> str:
+        return str(Path(directory).expanduser().resolve())
+
+    @staticmethod
+    def _build(rules: Rules, registry: Registry) -> Trie:
+        root: Trie = {}
+        for directory, name in rules.items():
+            node = root
+            for part in Path(directory).parts:
+                node = node.setdefault(part, {})
+
+            account = registry.get(name)
+            node[ACCOUNT] = name, str(account.cert_file.resolve()) if account else ""
+        return root
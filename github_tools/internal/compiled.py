@@ -0,0 +1,177 @@
+"""
+Read-only binary image of the registry for lookups that mustn't pay for loading it.
+
+Layout (little-endian):
+    - header: magic, version, count, identity of the ini file (inode, mtime, size), generation;
+    - rows: `count` rows sorted by name, each is (offset, length) of name, cert file, author and email in strings;
+    - certs: `count` row numbers sorted by cert file;
+    - emails: `count` row numbers sorted by case-folded email;
+    - strings: UTF-8 values.
+
+Readers map the file and bisect the tables, so a lookup reads a few pages no matter how many accounts there are.
+"""
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+from mmap import ACCESS_READ
+from mmap import mmap
+from os import PathLike
+from struct import Struct
+from sys import byteorder
+from types import TracebackType
+from typing import Self
+
+from github_tools.internal import profiling
+from github_tools.internal.account import AccountRecord
+from github_tools.internal.atomic import atomic_write
+from github_tools.internal.filestat import FileKey
+
+MAGIC = b"GHTREG\0\0"
+COMPILED_VERSION = 1
+
+HEADER = Struct("<8sIIQqQQ")
+ROW = Struct("<8I")
+ROW_NUMBER = Struct("<I")
+
+# positions of fields in a row
+NAME, CERT_FILE, AUTHOR, EMAIL = range(4)
+
+
+class _Keys:
+    """Sorted keys of a table as a sequence for `bisect`, values are decoded only when they're compared."""
+
+    def __init__(self, image: "CompiledRegistry", order: int | None, field: int) -> None:
+        self._image = image
+        self._order = order
+        self._field = field
+
+    def __len__(self) -> int:
+        return len(self._image)
+
+    def __getitem__(self, position: int) -> str:
+        row = self._image._row_number(self._order, position)
+        value = self._image._field(row, self._field)
+        return value.casefold() if self._field == EMAIL else value
+
+
+class CompiledRegistry:
+    """Mapped image of the registry, use `open` to get one."""
+
+    def __init__(self, buffer: mmap, key: FileKey, generation: int, count: int) -> None:
+        self._buffer = buffer
+        self.key = key
+        self.generation = generation
+        self._count = count
+        self._rows = HEADER.size
+        self._certs = self._rows + count * ROW.size
+        self._emails = self._certs + count * ROW_NUMBER.size
+        self._strings = self._emails + count * ROW_NUMBER.size
+
+    @classmethod
+    def open(cls, path: str | PathLike[str]) -> Self | None:
+        """Map the image, **None** is returned if it's missing or malformed."""
+        try:
+            with open(path, "rb") as file:
+                buffer = mmap(file.fileno(), 0, access=ACCESS_READ)
+        except (OSError, ValueError):  # mapping an empty file is a ValueError
+            return None
+
+        if len(buffer) >= HEADER.size:
+            magic, version, count, inode, mtime, size, generation = HEADER.unpack_from(buffer)
+            image = cls(buffer, (inode, mtime, size), generation, count)
+            if magic == MAGIC and version == COMPILED_VERSION and len(buffer) >= image._strings:
+                return image
+
+        buffer.close()
+        return None
+
+    def get(self, name: str) -> AccountRecord | None:
+        """Find the account by name."""
+        found = self._search(None, NAME, name)
+        return found[0] if found else None
+
+    def find_cert_file(self, cert_file: str) -> list[AccountRecord]:
+        """Find accounts by the cert file exactly as it was registered."""
+        return self._search(self._certs, CERT_FILE, cert_file)
+
+    def find_email(self, email: str) -> list[AccountRecord]:
+        """Find accounts by email, case-insensitively."""
+        return self._search(self._emails, EMAIL, email.casefold())
+
+    def close(self) -> None:
+        self._buffer.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, type: type[BaseException] | None, value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def _search(self, order: int | None, field: int, value: str) -> list[AccountRecord]:
+        with profiling.phase("compiled.search"):
+            keys = _Keys(self, order, field)
+            found = []
+            position = bisect_left(keys, value)
+            while position < self._count and keys[position] == value:
+                found.append(self._record(self._row_number(order, position)))
+                position += 1
+            return found
+
+    def _row_number(self, order: int | None, position: int) -> int:
+        if order is None:
+            return position
+        return int(ROW_NUMBER.unpack_from(self._buffer, order + position * ROW_NUMBER.size)[0])
+
+    def _field(self, row: int, field: int) -> str:
+        values = ROW.unpack_from(self._buffer, self._rows + row * ROW.size)
+        return self._string(values[field * 2], values[field * 2 + 1])
+
+    def _record(self, row: int) -> AccountRecord:
+        values = ROW.unpack_from(self._buffer, self._rows + row * ROW.size)
+        name, cert_file, author, email = (self._string(values[index], values[index + 1]) for index in range(0, 8, 2))
+        return name, cert_file, author, email
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        end = start + length
+        return self._buffer[start:end].decode("utf-8")
+
+
+def write_compiled(path: str | PathLike[str], key: FileKey, generation: int, records: Iterable[AccountRecord]) -> None:
+    """
+    Build the image of `records` made from the ini file with the given `key`.
+
+    The image is derived data, readers check it against the ini file, so failing to write it is not an error.
+    """
+    with profiling.phase("compiled.write"):
+        ordered = sorted(records)
+        rows = array("I")
+        strings = bytearray()
+        for record in ordered:
+            for value in record:
+                encoded = value.encode("utf-8")
+                rows.append(len(strings))
+                rows.append(len(encoded))
+                strings += encoded
+
+        positions = range(len(ordered))
+        certs = array("I", sorted(positions, key=lambda row: ordered[row][CERT_FILE]))
+        emails = array("I", sorted(positions, key=lambda row: ordered[row][EMAIL].casefold()))
+        if byteorder == "big":
+            for table in (rows, certs, emails):
+                table.byteswap()
+
+        try:
+            with atomic_write(path, binary=True, sync=False) as file:
+                header = HEADER.pack(MAGIC, COMPILED_VERSION, len(ordered), *key, generation)
+                file.write(header)
+                for table in (rows, certs, emails):
+                    file.write(table.tobytes())
+                file.write(strings)
+        except OSError:
+            pass
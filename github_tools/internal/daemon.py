@@ -0,0 +1,179 @@
+"""Long-running service answering registry and ssh config queries over a Unix socket."""
+from json import dumps
+from json import loads
+from os import chmod
+from os import PathLike
+from pathlib import Path
+from signal import signal
+from signal import SIGTERM
+from socketserver import StreamRequestHandler
+from socketserver import ThreadingUnixStreamServer
+from threading import Lock
+from types import FrameType
+from typing import Any
+
+from github_tools.internal.daemon_client import Request
+from github_tools.internal.daemon_client import request
+from github_tools.internal.daemon_client import Response
+from github_tools.internal.filestat import file_key
+from github_tools.internal.filestat import FileKey
+from github_tools.internal.keys import FingerprintCache
+from github_tools.internal.keys import inspect_key
+from github_tools.internal.keys import KeyStatus
+from github_tools.internal.registry import INDEXED_FIELDS
+from github_tools.internal.registry import Registry
+from github_tools.internal.registry import RegistryError
+from github_tools.internal.registry_file import RegistryFile
+from github_tools.internal.ssh_config import SshConfig
+from github_tools.internal.ssh_config import SshConfigError
+from github_tools.internal.symlink import Symlink
+
+
+class DaemonError(Exception):
+    def __init__(self, message: str) -> None:
+        self.message = message
+        super().__init__(message)
+
+
+class Service:
+    """
+    Registry and ssh config kept in memory between requests.
+
+    Both are reloaded lazily once the files they come from change on disk, the check is a few `stat` calls.
+    """
+
+    def __init__(self, config: Path, link: Path, ssh_config: Path) -> None:
+        self._storage = RegistryFile(config)
+        self._fingerprints = FingerprintCache(self._storage.fingerprints)
+        self._link = link
+        self._ssh_config_path = ssh_config
+        self._lock = Lock()
+
+        self._registry = Registry()
+        self._registry_stamp: tuple[FileKey | None, FileKey | None] | None = None
+        self._ssh_config: SshConfig | None = None
+
+    @property
+    def config(self) -> Path:
+        return self._storage.path
+
+    def handle(self, request: Request) -> Response:
+        """Answer a single request; failures are reported in the response, not raised."""
+        command = request.get("command")
+        handler = getattr(self, f"_handle_{command}", None) if isinstance(command, str) else None
+        if handler is None:
+            return {"ok": False, "error": f"unknown command ({command})"}
+
+        if command != "ping" and request.get("config") != str(self.config):
+            return {"ok": False, "error": "daemon serves another registry"}
+        if command != "ping" and request.get("link") != str(self._link):
+            return {"ok": False, "error": "daemon serves another identity link"}
+
+        try:
+            with self._lock:
+                result = handler(request)
+                self._fingerprints.save()
+                return {"ok": True, "result": result}
+        except (OSError, ValueError, RegistryError, SshConfigError) as error:
+            return {"ok": False, "error": getattr(error, "message", None) or str(error)}
+
+    def registry(self) -> Registry:
+        stamp = file_key(self._storage.path), file_key(self._storage.journal)
+        if stamp != self._registry_stamp:
+            self._registry = self._storage.load()
+            self._registry_stamp = stamp
+        return self._registry
+
+    def ssh_config(self) -> SshConfig | None:
+        if self._ssh_config is None or self._ssh_config.is_stale():
+            exists = self._ssh_config_path.is_file()
+            self._ssh_config = SshConfig.from_path(self._ssh_config_path) if exists else None
+        return self._ssh_config
+
+    def _handle_ping(self, request: Request) -> Any:
+        return "pong"
+
+    def _handle_list(self, request: Request) -> Any:
+        return [(*record, str(self._fingerprints.get(record[1]) or "")) for record in self.registry().records()]
+
+    def _handle_check(self, request: Request) -> Any:
+        account = self.registry().get(request["name"])
+        if account is None:
+            return None
+        status = inspect_key(account.cert_file)
+        if status is not KeyStatus.Valid:
+            return False, status.value
+        return True, str(self._fingerprints.get(account.cert_file) or "")
+
+    def _handle_find(self, request: Request) -> Any:
+        criteria = {field: request[field] for field in INDEXED_FIELDS if request.get(field) is not None}
+        return [account.name for account in self.registry().find(**criteria)]
+
+    def _handle_switch(self, request: Request) -> Any:
+        account = self.registry().get(request["name"])
+        if account is None:
+            return None
+        return str(self._link), str(Symlink.point(self._link, account.cert_file).target)
+
+    def _handle_current(self, request: Request) -> Any:
+        if not self._link.is_symlink():
+            return None
+
+        target = self._link.resolve()
+        for account in self.registry().accounts:
+            if account.cert_file.resolve() == target:
+                return account.name
+        return None
+
+    def _handle_check_ssh(self, request: Request) -> Any:
+        if request.get("ssh_config") != str(self._ssh_config_path):
+            raise ValueError("daemon serves another ssh config")
+
+        config = self.ssh_config()
+        if config is None:
+            return None
+        return {"valid": config.is_valid(), "github": "github.com" in config}
+
+
+class _Handler(StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = loads(line)
+                response = self.server.service.handle(request) if isinstance(request, dict) else None
+            except ValueError:
+                response = None
+
+            if response is None:
+                response = {"ok": False, "error": "malformed request"}
+            self.wfile.write(dumps(response).encode() + b"\n")
+
+
+class _Server(ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, service: Service) -> None:
+        self.service = service
+        super().__init__(path, _Handler)
+
+
+def serve(socket_path: str | PathLike[str], service: Service) -> None:
+    """Serve requests until interrupted."""
+    path = Path(socket_path)
+    if path.exists():
+        if request(path, {"command": "ping"}) is not None:
+            raise DaemonError(f"daemon is already listening on {path!s}")
+        path.unlink()  # left behind by a daemon that wasn't shut down cleanly
+
+    def stop(signum: int, frame: FrameType | None) -> None:
+        raise KeyboardInterrupt
+
+    signal(SIGTERM, stop)
+    with _Server(str(path), service) as server:
+        chmod(path, 0o600)
+        try:
+            server.serve_forever()
+        finally:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,43 @@
+"""
+Client side of the `github-account serve` protocol.
+
+Only the socket and JSON modules are imported, so asking the daemon costs the client next to nothing on top of the
+interpreter startup.
+"""
+from json import dumps
+from json import loads
+from os import PathLike
+from socket import AF_UNIX
+from socket import SOCK_STREAM
+from socket import socket
+from typing import Any
+
+# how long the client waits for the daemon before falling back to doing the work itself
+CLIENT_TIMEOUT = 2.0
+
+Request = dict[str, Any]
+Response = dict[str, Any]
+
+
+def request(socket_path: str | PathLike[str], payload: Request) -> Response | None:
+    """Send the request to the daemon, **None** is returned if no daemon is listening or its reply is malformed."""
+    try:
+        with socket(AF_UNIX, SOCK_STREAM) as connection:
+            connection.settimeout(CLIENT_TIMEOUT)
+            connection.connect(str(socket_path))
+            connection.sendall(dumps(payload).encode() + b"\n")
+
+            chunks: list[bytes] = []
+            while not chunks or not chunks[-1].endswith(b"\n"):
+                chunk = connection.recv(65536)
+                if not chunk:
+                    return None
+                chunks.append(chunk)
+    except OSError:
+        return None
+
+    try:
+        response = loads(b"".join(chunks))
+    except ValueError:
+        return None
+    return response if isinstance(response, dict) else None
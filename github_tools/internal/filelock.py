@@ -0,0 +1,73 @@
+"""Advisory inter-process file lock."""
+from os import PathLike
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO
+from typing import Self
+
+try:
+    from fcntl import flock
+    from fcntl import LOCK_EX
+    from fcntl import LOCK_UN
+
+    def _lock(file: BinaryIO) -> None:
+        flock(file.fileno(), LOCK_EX)
+
+    def _unlock(file: BinaryIO) -> None:
+        flock(file.fileno(), LOCK_UN)
+
+except ImportError:  # Windows
+    from msvcrt import LK_LOCK  # type: ignore[attr-defined]
+    from msvcrt import LK_UNLCK  # type: ignore[attr-defined]
+    from msvcrt import locking  # type: ignore[attr-defined]
+
+    def _lock(file: BinaryIO) -> None:
+        file.seek(0)
+        locking(file.fileno(), LK_LOCK, 1)
+
+    def _unlock(file: BinaryIO) -> None:
+        file.seek(0)
+        locking(file.fileno(), LK_UNLCK, 1)
+
+
+class FileLock:
+    """
+    Exclusive advisory lock held on a dedicated lock file.
+
+    The lock is reentrant within the object: nested `with` blocks only acquire it once.
+    """
+
+    def __init__(self, path: str | PathLike[str]) -> None:
+        self._path = Path(path)
+        self._file: BinaryIO | None = None
+        self._depth = 0
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def locked(self) -> bool:
+        return self._depth > 0
+
+    def __enter__(self) -> Self:
+        if self._depth == 0:
+            file = open(self._path, "a+b")
+            try:
+                _lock(file)
+            except BaseException:
+                file.close()
+                raise
+            self._file = file
+
+        self._depth += 1
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            _unlock(self._file)
+            self._file.close()
+            self._file = None
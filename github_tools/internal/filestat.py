@@ -0,0 +1,23 @@
+"""Cheap file identity used to validate on-disk caches."""
+from os import PathLike
+from os import stat
+from stat import S_ISREG
+
+from github_tools.internal import profiling
+
+# (inode, mtime in nanoseconds, size)
+FileKey = tuple[int, int, int]
+
+
+def file_key(path: str | PathLike[str], regular: bool = False) -> FileKey | None:
+    """Return the identity of the file or **None** if it can't be stat'ed (or isn't a regular file when `regular`)."""
+    profiling.count("files stat'ed")
+    try:
+        info = stat(path)
+    except OSError:
+        return None
+
+    if regular and not S_ISREG(info.st_mode):
+        return None
+
+    return info.st_ino, info.st_mtime_ns, info.st_size
@@ -0,0 +1,83 @@
+"""Streaming output of account records."""
+from collections.abc import Iterable
+from json import dumps
+from typing import TextIO
+
+# name, cert_file, author, email, key description
+Record = tuple[str, str, str, str, str]
+
+FIELDS = ("name", "cert_file", "author", "email", "key")
+FORMATS = ("text", "json", "jsonl", "tsv")
+
+TEXT_TEMPLATE = "{}:\n    cert:   '{}'\n    key:    {}\n    author: {}\n    email:  {}\n"
+
+# output is collected into chunks of about this size before it's written
+BUFFER_SIZE = 64 * 1024
+
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+class _Buffer:
+    def __init__(self, stream: TextIO) -> None:
+        self._stream = stream
+        self._chunks: list[str] = []
+        self._size = 0
+
+    def write(self, text: str) -> None:
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._chunks:
+            self._stream.write("".join(self._chunks))
+            self._chunks.clear()
+            self._size = 0
+        self._stream.flush()
+
+
+def write_records(
+    stream: TextIO, records: Iterable[Record], fields: Iterable[str] = FIELDS, format: str = "text"
+) -> int:
+    """
+    Write records as they come in the `format`, only the `fields` are written by the machine-readable formats.
+
+    Lines are joined into chunks of `BUFFER_SIZE` characters, so the stream gets a write per chunk, not per line.
+    Returns the number of written records.
+    """
+    indexes = [FIELDS.index(field) for field in fields]
+    names = [FIELDS[index] for index in indexes]
+    buffer = _Buffer(stream)
+    count = 0
+
+    if format == "tsv":
+        buffer.write("\t".join(names) + "\n")
+    elif format == "json":
+        buffer.write("[")
+
+    for record in records:
+        match format:
+            case "json" | "jsonl":
+                line = dumps({name: record[index] for name, index in zip(names, indexes)}, ensure_ascii=False)
+                if format == "json":
+                    line = (",\n " if count else "\n ") + line
+                else:
+                    line += "\n"
+            case "tsv":
+                line = "\t".join(record[index].translate(_TSV_ESCAPES) for index in indexes) + "\n"
+            case _:
+                name, cert_file, author, email, key = record
+                line = TEXT_TEMPLATE.format(name, cert_file, key or "unknown", repr(author), repr(email))
+                if not count:
+                    line = "Github Accounts:\n" + line
+        buffer.write(line)
+        count += 1
+
+    if format == "json":
+        buffer.write("\n]\n" if count else "]\n")
+    elif format == "text" and not count:
+        buffer.write("no accounts\n")
+
+    buffer.flush()
+    return count
@@ -0,0 +1,146 @@
+"""Bulk import of accounts streamed from key directories, CSV and JSON Lines files."""
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from csv import DictReader
+from csv import Error as CsvError
+from glob import iglob
+from itertools import islice
+from json import loads
+from os import PathLike
+from os.path import expanduser
+from pathlib import Path
+from typing import TextIO
+
+from github_tools.internal.account import Account
+from github_tools.internal.keys import inspect_key
+from github_tools.internal.keys import KeyStatus
+from github_tools.internal.registry import Registry
+from github_tools.internal.validation import check_accounts
+
+# accounts validated at once, it bounds the memory taken by the pipeline
+CHUNK_SIZE = 256
+
+FIELDS = ("name", "cert_file", "author", "email")
+
+# statuses of files that aren't keys at all, they are skipped silently while scanning key directories
+NOT_KEYS = (KeyStatus.NotFile, KeyStatus.Empty, KeyStatus.PublicKey, KeyStatus.UnknownFormat)
+
+
+class SourceError(Exception):
+    """
+    Exception raised for a malformed record of the imported file.
+
+    Attributes:
+        line    -- number of the line with the record
+        message -- explanation of the error
+    """
+
+    def __init__(self, line: int, message: str):
+        self.line = line
+        self.message = message
+        super().__init__(f"line {line}: {message}")
+
+
+def read_key_files(pattern: str, link: str | PathLike[str] | None = None) -> Iterator[Account]:
+    """
+    Yield an account named after the file for every file matching the glob `pattern`.
+
+    The identity `link` is skipped: it lives in *~/.ssh* next to the keys and would make an account duplicating the
+    active one.
+    """
+    skipped = Path(link).expanduser().absolute() if link is not None else None
+    for path in iglob(expanduser(pattern)):
+        if not path.endswith(".pub") and Path(path).absolute() != skipped:
+            yield Account.create(Path(path).name, path)
+
+
+def read_csv(file: TextIO) -> Iterator[Account]:
+    """Yield accounts from CSV rows with the *name* and *cert_file* columns, *author* and *email* are optional."""
+    reader = DictReader(file)
+    try:
+        for row in reader:
+            yield _make_account(reader.line_num, row)
+    except CsvError as error:
+        raise SourceError(reader.line_num, str(error))
+
+
+def read_jsonl(file: TextIO) -> Iterator[Account]:
+    """Yield accounts from JSON objects (one per line) with the same fields as CSV rows."""
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+
+        try:
+            record = loads(line)
+        except ValueError as error:
+            raise SourceError(number, f"malformed JSON: {error}")
+
+        if not isinstance(record, dict):
+            raise SourceError(number, "record isn't an object")
+        yield _make_account(number, record)
+
+
+def import_accounts(
+    registry: Registry,
+    accounts: Iterable[Account],
+    report: Callable[[Account, str], None],
+    scanning: bool = False,
+    workers: int = 16,
+    timeout: float = 5.0,
+) -> dict[str, int]:
+    """
+    Add new accounts with valid keys to the registry, the rest is reported by `report(account, reason)`.
+
+    Accounts are consumed lazily and validated in parallel chunk by chunk, so only a chunk of the input is held in
+    memory. Accounts whose name or cert file is already registered are skipped as duplicates. While `scanning` a key
+    directory, files that aren't private keys are skipped without a report. Returns counts of accounts by outcome.
+    """
+    counts = dict.fromkeys(("imported", "duplicate", "invalid", "ignored"), 0)
+    iterator = iter(accounts)
+    while chunk := list(islice(iterator, CHUNK_SIZE)):
+        candidates = []
+        for account in chunk:
+            if _is_registered(registry, account):
+                counts["duplicate"] += 1
+                report(account, "already registered")
+            else:
+                candidates.append(account)
+
+        # results come in the order checks finish, accounts are added in the input order so the first record wins
+        statuses = dict(check_accounts(candidates, _check_key, workers=workers, timeout=timeout))
+        for account in candidates:
+            status = statuses[account]
+            if status is KeyStatus.Valid:
+                if _is_registered(registry, account):  # the same name or key came earlier in the input
+                    counts["duplicate"] += 1
+                    report(account, "duplicate record")
+                else:
+                    registry.add(account)
+                    counts["imported"] += 1
+            elif scanning and status in NOT_KEYS:
+                counts["ignored"] += 1
+            else:
+                counts["invalid"] += 1
+                report(account, status.value if status is not None else "check timed out")
+    return counts
+
+
+def _is_registered(registry: Registry, account: Account) -> bool:
+    return account.name in registry or bool(registry.find(cert_file=account.cert_file))
+
+
+def _check_key(account: Account) -> KeyStatus:
+    return inspect_key(account.cert_file)
+
+
+def _make_account(line: int, record: dict[str, object]) -> Account:
+    values = {field: record.get(field) or "" for field in FIELDS}
+    strings = {field: value for field, value in values.items() if isinstance(value, str)}
+    if len(strings) != len(values):
+        raise SourceError(line, "fields must be strings")
+
+    if not strings["name"] or not strings["cert_file"]:
+        raise SourceError(line, "name and cert_file are required")
+
+    return Account.create(strings["name"], expanduser(strings["cert_file"]), strings["author"], strings["email"])
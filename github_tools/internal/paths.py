@@ -0,0 +1,7 @@
+"""Default locations of the files the tools work with."""
+from pathlib import Path
+
+CONFIG = Path.home() / ".github-tools.cfg"
+LINK = Path.home() / ".ssh" / "github-identity"
+SOCKET = Path.home() / ".github-tools.sock"
+SSH_CONFIG = Path.home() / ".ssh" / "config"
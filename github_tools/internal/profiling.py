@@ -0,0 +1,154 @@
+"""
+Opt-in instrumentation of the hot paths: nested phase timings and counters.
+
+Profiling is enabled by `enable` (`github-account --profile`) or by the **GITHUB_TOOLS_PROFILE** environment variable,
+which is either a file path or **-** for stderr. The report is written as JSON once the process exits.
+
+While disabled `phase` returns a shared no-op context manager and `count` returns right away, so instrumented code pays
+a function call per phase. Per-item work (every parsed account, every stat'ed file) is counted in bulk or by callers
+that run rarely, never wrapped into a phase of its own.
+"""
+from atexit import register
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from contextlib import contextmanager
+from contextlib import nullcontext
+from os import environ
+from sys import stderr
+from threading import local
+from threading import Lock
+from time import perf_counter
+from typing import Any
+
+from github_tools import IMPORT_STARTED
+
+ENVIRONMENT_VARIABLE = "GITHUB_TOOLS_PROFILE"
+
+_DISABLED: AbstractContextManager[None] = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("name", "elapsed", "calls", "children")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.elapsed = 0.0
+        self.calls = 0
+        self.children: dict[str, _Phase] = {}
+
+    def child(self, name: str) -> "_Phase":
+        phase = self.children.get(name)
+        if phase is None:
+            phase = self.children[name] = _Phase(name)
+        return phase
+
+    def dump(self) -> dict[str, Any]:
+        result: dict[str, Any] = {"name": self.name, "ms": round(self.elapsed * 1000, 3), "calls": self.calls}
+        if self.children:
+            result["phases"] = [child.dump() for child in self.children.values()]
+        return result
+
+
+class Profiler:
+    """
+    Phases and counters of a single process.
+
+    Phases entered again under the same parent are merged, so a phase reports the total time and the number of calls.
+    Every thread keeps its own stack of open phases, phases of worker threads are attached to the root.
+    """
+
+    def __init__(self, output: str, started: float) -> None:
+        self._output = output
+        self._started = started
+        self._root = _Phase("total")
+        self._counters: dict[str, int] = {}
+        self._stacks = local()
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        stack = self._stack()
+        with self._lock:
+            current = stack[-1].child(name)
+        stack.append(current)
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - started
+            stack.pop()
+            with self._lock:
+                current.elapsed += elapsed
+                current.calls += 1
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def record(self, name: str, elapsed: float) -> None:
+        """Add a phase measured elsewhere (like imports, which run before profiling can be enabled)."""
+        with self._lock:
+            phase = self._root.child(name)
+            phase.elapsed += elapsed
+            phase.calls += 1
+
+    def report(self) -> dict[str, Any]:
+        self._root.elapsed = perf_counter() - self._started
+        self._root.calls = 1
+        return {**self._root.dump(), "counters": dict(sorted(self._counters.items()))}
+
+    def write(self) -> None:
+        from json import dumps
+
+        content = dumps(self.report(), indent=2) + "\n"
+        if self._output == "-":
+            stderr.write(content)
+            return
+
+        try:
+            with open(self._output, "w", encoding="utf-8") as file:
+                file.write(content)
+        except OSError as error:
+            stderr.write(f"can't write profile to {self._output!r}: {error.strerror}\n")
+
+    def _stack(self) -> list[_Phase]:
+        stack: list[_Phase] | None = getattr(self._stacks, "stack", None)
+        if stack is None:
+            stack = self._stacks.stack = [self._root]
+        return stack
+
+
+_profiler: Profiler | None = None
+
+
+def enable(output: str = "-") -> Profiler:
+    """
+    Start profiling (once per process), the report goes to `output` (**-** is stderr) at exit.
+
+    The total time is counted from the moment the package started importing.
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(output, IMPORT_STARTED)
+        register(_profiler.write)
+    return _profiler
+
+
+def enabled() -> bool:
+    return _profiler is not None
+
+
+def phase(name: str) -> AbstractContextManager[None]:
+    """Time the block as a phase nested into the currently open one."""
+    if _profiler is None:
+        return _DISABLED
+    return _profiler.phase(name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    if _profiler is not None:
+        _profiler.count(name, amount)
+
+
+if environ.get(ENVIRONMENT_VARIABLE):
+    enable(environ[ENVIRONMENT_VARIABLE])
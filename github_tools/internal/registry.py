@@ -1,17 +1,27 @@
 """Simple registry based on ini/cfg files."""
-from configparser import ConfigParser
-from configparser import DuplicateSectionError
-from configparser import ParsingError
-from dataclasses import asdict
+from array import array
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
 from enum import auto
 from enum import IntEnum
+from io import StringIO
+from os import PathLike
+from os import sep
+from pathlib import Path
+from re import compile
+from re import MULTILINE
 from typing import Self
 from typing import TextIO
+from typing import TYPE_CHECKING
 
+from github_tools.internal import profiling
 from github_tools.internal.account import Account
+from github_tools.internal.account import AccountRecord
 
-
-Storage = ConfigParser
+if TYPE_CHECKING:
+    # configparser is imported lazily: commands that never touch the registry shouldn't pay for it
+    from configparser import ConfigParser as Storage
 
 
 class ErrorCode(IntEnum):
@@ -19,6 +29,8 @@ class ErrorCode(IntEnum):
     DuplicateAccount = auto()
     FieldMissed = auto()
     FieldValueMissed = auto()
+    StaleRegistry = auto()
+    UnsupportedSchema = auto()
 
 
 class RegistryError(Exception):
@@ -36,70 +48,383 @@ class RegistryError(Exception):
         super().__init__(message)
 
 
+INDEXED_FIELDS = ("email", "author", "cert_file")
+
+# index of cert files after resolving symlinks, it costs a stat per account, so it's built only when needed
+RESOLVED_CERT_FILE = "resolved_cert_file"
+
+# version of the registry format, files that don't state it have the first one
+SCHEMA_VERSION = 1
+
+# schema version -> upgrade of a record to the next version, applied to sections as they're parsed
+MIGRATIONS: dict[int, Callable[[AccountRecord], AccountRecord]] = {}
+
+# ConfigParser's section header at the start of a line
+_SECTION = compile(r"^\[(?P<name>.+)\]", MULTILINE)
+
+
+class _Index:
+    """Names of accounts by the normalized value of a field, a dict is used as an ordered set of names."""
+
+    __slots__ = ("_field", "_names", "_keys")
+
+    def __init__(self, field: str) -> None:
+        self._field = field
+        self._names: dict[str, dict[str, None]] = {}
+        self._keys: dict[str, str] = {}  # name -> the key it's indexed under
+
+    def add(self, name: str, value: str) -> None:
+        key = self.key(value)
+        self._names.setdefault(key, {})[name] = None
+        self._keys[name] = key
+
+    def discard(self, name: str) -> None:
+        key = self._keys.pop(name, None)
+        names = self._names.get(key, {}) if key is not None else {}
+        names.pop(name, None)
+        if key is not None and not names:
+            del self._names[key]
+
+    def get(self, value: str | PathLike[str]) -> dict[str, None]:
+        return self._names.get(self.key(value), {})
+
+    def key(self, value: str | PathLike[str]) -> str:
+        if self._field == "cert_file":
+            return str(Path(value).expanduser().absolute())
+        if self._field == RESOLVED_CERT_FILE:
+            return str(Path(value).expanduser().resolve())
+        return str(value).casefold() if self._field == "email" else str(value)
+
+
+class _StringPool:
+    """Interned strings referred to by their ids, the empty string is always 0."""
+
+    __slots__ = ("_ids", "_values")
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {"": 0}
+        self._values: list[str] = [""]
+
+    def intern(self, value: str) -> int:
+        id = self._ids.get(value)
+        if id is None:
+            id = self._ids[value] = len(self._values)
+            self._values.append(value)
+        return id
+
+    def __getitem__(self, id: int) -> str:
+        return self._values[id]
+
+
+# accounts written to the stream at once by `Registry.save`
+SAVE_CHUNK = 4096
+
+
 class Registry:
+    """
+    Accounts keyed by name.
+
+    Accounts are stored in columns rather than as `Account` objects: a row per account with the parts shared by many
+    accounts (directories of cert files, authors, email domains) interned into a string pool and referred to by ids in
+    compact arrays, only the unique parts (file names, email local parts) are kept as separate strings. `Account`
+    objects are built on access. Removed rows are reclaimed once they make up half of the columns.
+
+    A lazily loaded registry only indexes sections of the ini file by their offsets and parses an account once its row
+    is read, so a malformed section fails only the commands touching it. Reading all rows parses the whole file at once.
+
+    Lookups by email, author and cert file go through hash indexes. An index is built on the first `find` by its field,
+    so loading doesn't pay for it, and from then on it's kept up to date by `add` and `remove`.
+    """
+
     def __init__(self) -> None:
-        self._accounts: dict[str, Account] = dict()
+        self._reset()
+        self._indexes: dict[str, _Index] = {}
 
     @classmethod
-    def load(cls, io: TextIO) -> Self:
-        """Load registry from stream."""
+    def load(
+        cls,
+        io: TextIO,
+        schema: int = SCHEMA_VERSION,
+        lazy: bool = False,
+        on_parsed: Callable[[list[AccountRecord]], None] | None = None,
+    ) -> Self:
+        """
+        Load registry written in the `schema` version from stream, records are upgraded to the current one.
+
+        With `lazy` only the layout of the file is checked, accounts are validated as they're read. `on_parsed` gets
+        records of all sections once the whole file is parsed.
+        """
+        if schema > SCHEMA_VERSION:
+            raise RegistryError(ErrorCode.UnsupportedSchema, f"Registry file schema ({schema}) isn't supported")
+
         registry = cls()
+        registry._schema = schema
+        registry._on_parsed = on_parsed
+        source = io.read()
+        if lazy and registry._index(source):
+            return registry
+
+        with profiling.phase("read_storage"):
+            storage = cls._read_storage(StringIO(source))
 
-        storage = cls._read_storage(io)
-        for account_name in storage.sections():
-            account = cls._read_account(account_name, storage)
-            registry.add(account)
+        with profiling.phase("read_accounts"):
+            records = [registry._read_record(name, storage) for name in storage.sections()]
+            for record in records:
+                registry._put(*record)
 
+        profiling.count("accounts parsed", len(records))
+        if on_parsed is not None:
+            on_parsed(records)
         return registry
 
+    @classmethod
+    def from_records(cls, records: Iterable[AccountRecord]) -> Self:
+        """Build registry from already validated records bypassing the ini parser."""
+        registry = cls()
+        for name, cert_file, author, email in records:
+            registry._put(name, cert_file, author, email)
+        return registry
+
+    def records(self) -> Iterator[AccountRecord]:
+        """Iterate over accounts as plain records."""
+        self._parse_pending()
+        for name, row in self._rows.items():
+            yield name, *self._row(row)
+
     def save(self, io: TextIO) -> None:
-        """Dump the registry to the stream in ini-format."""
-        storage = Storage()
-        for account in self._accounts.values():
-            self._dump_account(account, storage)
-        storage.write(io)
+        """Dump the registry to the stream in ini-format, it's written straight from the columns."""
+        chunk: list[str] = []
+        for name, cert_file, author, email in self.records():
+            chunk.append(f"[{name}]\ncert_file = {self._escape(cert_file)}\n")
+            if author:
+                chunk.append(f"author = {self._escape(author)}\n")
+            if email:
+                chunk.append(f"email = {self._escape(email)}\n")
+            chunk.append("\n")
+
+            if len(chunk) >= SAVE_CHUNK:
+                io.write("".join(chunk))
+                chunk.clear()
+        io.write("".join(chunk))
 
     def get(self, name: str) -> Account | None:
         """Get an account by name otherwise return None."""
-        return self._accounts.get(name)
+        row = self._rows.get(name)
+        if row is None:
+            return None
+        return self._account(name, row)
 
     def add(self, account: Account, rewrite: bool = False) -> bool:
         """Add the name to the registry or replace the existing one if a *rewrite* is set to **True**."""
-        if account.name in self._accounts and not rewrite:
+        if account.name in self._rows and not rewrite:
             return False
 
-        self._accounts[account.name] = account
+        self._put(account.name, str(account.cert_file), account.author or "", account.email or "")
         return True
 
     def remove(self, account: str | Account) -> bool:
         """Remove the name from the registry if present."""
         name = self._get_name(account)
-        if name not in self._accounts:
+        row = self._rows.pop(name, None)
+        if row is None:
             return False
 
-        del self._accounts[name]
+        # the row is left as a hole, only the unique strings are released right away
+        self._pending.pop(row, None)
+        self._cert_names[row] = self._email_locals[row] = ""
+        self._holes += 1
+        if self._holes > 1024 and self._holes * 2 > len(self._cert_names):
+            self._compact()
+
+        for index in self._indexes.values():
+            index.discard(name)
         return True
 
+    def find(
+        self, *, email: str | None = None, author: str | None = None, cert_file: str | PathLike[str] | None = None
+    ) -> list[Account]:
+        """
+        Find accounts matching all given fields.
+
+        Emails are compared case-insensitively. Cert files are looked up as registered, by the given and the resolved
+        path, so only the query is resolved. Cert files of all accounts are resolved only if that finds nothing (the
+        file is registered under another path, e.g. through a symlinked directory).
+        """
+        criteria = {"email": email, "author": author, "cert_file": cert_file}
+        names: dict[str, None] | None = None
+        for field, value in criteria.items():
+            if value is None:
+                continue
+
+            found = self._field_index(field).get(value)
+            if field == "cert_file":
+                path = Path(value).expanduser()
+                found = found or self._field_index(field).get(path.resolve())
+                found = found or self._field_index(RESOLVED_CERT_FILE).get(path)
+            names = found if names is None else {name: None for name in names if name in found}
+        return [self._account(name, self._rows[name]) for name in names or ()]
+
+    def __iter__(self) -> Iterator[Account]:
+        """Iterate over accounts without copying them into a list, they are built one by one."""
+        self._parse_pending()
+        for name, row in self._rows.items():
+            yield self._account(name, row)
+
     def __len__(self) -> int:
         """Get amount of registered accounts."""
-        return len(self._accounts)
+        return len(self._rows)
 
     def __contains__(self, account: str | Account) -> bool:
         """Check for account is registered or not."""
         name = self._get_name(account)
-        return name in self._accounts
+        return name in self._rows
 
     @property
     def accounts(self) -> list[Account]:
         """Return list of accounts."""
-        return list(self._accounts.values())
+        return list(self)
+
+    def _reset(self) -> None:
+        self._schema = SCHEMA_VERSION
+        self._on_parsed: Callable[[list[AccountRecord]], None] | None = None
+        self._source = ""
+        self._sections = 0
+        self._pending: dict[int, tuple[int, int]] = {}  # row -> offsets of the unparsed section in the source
+        self._rows: dict[str, int] = {}
+        self._strings = _StringPool()
+        self._cert_dirs = array("I")
+        self._cert_names: list[str] = []
+        self._authors = array("I")
+        self._email_locals: list[str] = []
+        self._email_domains = array("I")
+        self._holes = 0
+
+    def _put(self, name: str, cert_file: str, author: str, email: str) -> None:
+        split = max(cert_file.rfind("/"), cert_file.rfind(sep)) + 1
+        cert_dir, cert_name = self._strings.intern(cert_file[:split]), cert_file[split:]
+        split = email.rfind("@")
+        if split == -1:
+            split = len(email)
+        email_local, email_domain = email[:split], self._strings.intern(email[split:])
+        author_id = self._strings.intern(author)
+
+        row = self._rows.get(name)
+        if row is None:
+            self._rows[name] = len(self._cert_names)
+            self._cert_dirs.append(cert_dir)
+            self._cert_names.append(cert_name)
+            self._authors.append(author_id)
+            self._email_locals.append(email_local)
+            self._email_domains.append(email_domain)
+        else:
+            self._pending.pop(row, None)
+            self._cert_dirs[row] = cert_dir
+            self._cert_names[row] = cert_name
+            self._authors[row] = author_id
+            self._email_locals[row] = email_local
+            self._email_domains[row] = email_domain
+
+        if self._indexes:
+            values = {**dict(zip(INDEXED_FIELDS, (email, author, cert_file))), RESOLVED_CERT_FILE: cert_file}
+            for field, index in self._indexes.items():
+                index.discard(name)
+                index.add(name, values[field])
+
+    def _row(self, row: int) -> tuple[str, str, str]:
+        if row in self._pending:
+            self._parse_section(row)
+
+        strings = self._strings
+        return (
+            strings[self._cert_dirs[row]] + self._cert_names[row],
+            strings[self._authors[row]],
+            self._email_locals[row] + strings[self._email_domains[row]],
+        )
+
+    def _account(self, name: str, row: int) -> Account:
+        cert_file, author, email = self._row(row)
+        return Account(name=name, cert_file=Path(cert_file), author=author, email=email)
+
+    def _index(self, source: str) -> bool:
+        """Reserve a row for every section of the source, **False** if it has to be parsed at once."""
+        with profiling.phase("index_sections"):
+            sections = list(_SECTION.finditer(source))
+            preamble = source[: sections[0].start()] if sections else source
+            if any(line.strip() and line.lstrip()[0] not in "#;" for line in preamble.splitlines()):
+                return False  # leave reporting the error to the parser
+            if any(section["name"] == "DEFAULT" for section in sections):
+                return False  # its values are shared by all sections
+
+            self._source = source
+            for section, following in zip(sections, [*sections[1:], None]):
+                name = section["name"]
+                if name in self._rows:
+                    raise RegistryError(ErrorCode.DuplicateAccount, "Registry file contains duplicates")
+
+                self._rows[name] = row = len(self._cert_names)
+                self._pending[row] = section.start(), following.start() if following else len(source)
+                self._cert_dirs.append(0)
+                self._cert_names.append("")
+                self._authors.append(0)
+                self._email_locals.append("")
+                self._email_domains.append(0)
+            self._sections = len(sections)
+
+        profiling.count("sections indexed", len(sections))
+        return True
+
+    def _parse_section(self, row: int) -> None:
+        start, end = self._pending[row]
+        storage = self._read_storage(StringIO(self._source[start:end]))
+        self._put(*self._read_record(storage.sections()[0], storage))
+        profiling.count("accounts parsed")
+
+    def _parse_pending(self) -> None:
+        """Parse all pending sections at once, sections replaced or removed since loading aren't parsed at all."""
+        if not self._pending:
+            return
+
+        complete = len(self._pending) == self._sections
+        with profiling.phase("read_storage"):
+            text = "".join(self._source[start:end] for start, end in self._pending.values())
+            storage = self._read_storage(StringIO(text))
+
+        with profiling.phase("read_accounts"):
+            records = [self._read_record(name, storage) for name in storage.sections()]
+            for record in records:
+                self._put(*record)
+
+        profiling.count("accounts parsed", len(records))
+        self._source = ""
+        if complete and self._on_parsed is not None:
+            self._on_parsed(records)
+
+    def _compact(self) -> None:
+        records = list(self.records())
+        self._reset()
+        for record in records:
+            self._put(*record)
+
+    def _field_index(self, field: str) -> _Index:
+        index = self._indexes.get(field)
+        if index is None:
+            index = self._indexes[field] = _Index(field)
+            # records are (name, cert_file, author, email)
+            position = {"cert_file": 1, RESOLVED_CERT_FILE: 1, "author": 2, "email": 3}[field]
+            for record in self.records():
+                index.add(record[0], record[position])
+        return index
 
     @staticmethod
     def _get_name(account: str | Account) -> str:
         return account if isinstance(account, str) else account.name
 
     @staticmethod
-    def _read_storage(io: TextIO) -> Storage:
+    def _read_storage(io: TextIO) -> "Storage":
+        from configparser import ConfigParser as Storage
+        from configparser import DuplicateSectionError
+        from configparser import ParsingError
+
         storage = Storage()
         try:
             storage.read_file(io)
@@ -109,8 +434,15 @@ class Registry:
             raise RegistryError(ErrorCode.DuplicateAccount, "Registry file contains duplicates")
         return storage
 
+    def _read_record(self, account_name: str, storage: "Storage") -> AccountRecord:
+        account = self._read_account(account_name, storage)
+        record = account.name, str(account.cert_file), account.author or "", account.email or ""
+        for schema in range(self._schema, SCHEMA_VERSION):
+            record = MIGRATIONS[schema](record)
+        return record
+
     @staticmethod
-    def _read_account(account_name: str, storage: Storage) -> Account:
+    def _read_account(account_name: str, storage: "Storage") -> Account:
         fields = storage[account_name]
         if "cert_file" not in fields:
             raise RegistryError(ErrorCode.FieldMissed, f"Field (cert_file) is missed for name ({account_name})")
@@ -123,7 +455,6 @@ class Registry:
         return Account.create(account_name, **fields)
 
     @staticmethod
-    def _dump_account(account: Account, storage: Storage) -> None:
-        # asdict isn't the best choice, but we don't care about performance for now
-        record = {field: str(value) for field, value in asdict(account).items() if field != "name" and value}
-        storage[account.name] = record
+    def _escape(value: str) -> str:
+        """Escape the value the way ConfigParser reads it back: interpolation and continuation lines."""
+        return value.replace("%", "%%").replace("\n", "\n\t")
@@ -0,0 +1,398 @@
+"""Registry persisted in an ini file."""
+from collections.abc import Callable
+from functools import partial
+from json import dumps
+from json import loads
+from os import PathLike
+from pathlib import Path
+from typing import BinaryIO
+from typing import TypeVar
+
+from github_tools.internal import profiling
+from github_tools.internal.account import Account
+from github_tools.internal.account import AccountRecord
+from github_tools.internal.atomic import atomic_write
+from github_tools.internal.compiled import CompiledRegistry
+from github_tools.internal.compiled import write_compiled
+from github_tools.internal.filelock import FileLock
+from github_tools.internal.filestat import file_key
+from github_tools.internal.registry import ErrorCode
+from github_tools.internal.registry import Registry
+from github_tools.internal.registry import RegistryError
+from github_tools.internal.registry import SCHEMA_VERSION
+from github_tools.internal.snapshot import read_snapshot
+from github_tools.internal.snapshot import write_snapshot
+
+# journal size (in bytes) after which it's folded back into the ini file
+JOURNAL_LIMIT = 64 * 1024
+
+HEADER_PREFIX = "# github-tools registry: generation="
+SCHEMA_FIELD = " schema="
+
+# (generation of the ini file, size of the journal)
+Stamp = tuple[int, int]
+
+# journaled changes in order: (name, the account record or None if it was removed)
+Changes = list[tuple[str, AccountRecord | None]]
+
+T = TypeVar("T")
+
+
+class RegistryFile:
+    """
+    Registry bound to the ini file on disk.
+
+    Parsed accounts are cached in a binary snapshot next to the file (*<name>.snapshot*), so while the ini file is
+    unchanged loading skips ConfigParser entirely.
+
+    Single-account mutations don't rewrite the ini file: they are appended to the journal (*<name>.journal*) which is
+    replayed over the ini file on load and compacted into it once it grows past `journal_limit` bytes.
+
+    The header of the file states its generation and schema version. Without a valid snapshot the file is loaded
+    lazily (see `Registry`) and records of an older schema are upgraded as they're parsed, the file itself is
+    rewritten in the current schema by the next full save.
+
+    Lookups of a single account can skip loading altogether: once `compile` has made the compiled image of the
+    registry (*<name>.compiled*), every full save regenerates it and `lookup` searches it in place.
+
+    Writers serialize on an advisory lock (*<name>.lock*) and the ini file is always replaced atomically. Every full
+    save bumps the generation stored in the file header; a save based on an outdated load fails with
+    **ErrorCode.StaleRegistry** instead of overwriting somebody else's changes, use `update` to get a locked
+    read-modify-write.
+    """
+
+    def __init__(self, path: str | PathLike[str], journal_limit: int = JOURNAL_LIMIT) -> None:
+        self._path = Path(path)
+        self._journal_limit = journal_limit
+        self._lock = FileLock(self._path.with_name(f"{self._path.name}.lock"))
+        self._stamp: Stamp | None = None
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def snapshot(self) -> Path:
+        return self._path.with_name(f"{self._path.name}.snapshot")
+
+    @property
+    def journal(self) -> Path:
+        return self._path.with_name(f"{self._path.name}.journal")
+
+    @property
+    def fingerprints(self) -> Path:
+        """Return the location of the key fingerprint cache of the registered accounts."""
+        return self._path.with_name(f"{self._path.name}.fingerprints")
+
+    @property
+    def bindings(self) -> Path:
+        """Return the location of directories bound to accounts."""
+        return self._path.with_name(f"{self._path.name}.bindings")
+
+    @property
+    def bindings_trie(self) -> Path:
+        return self._path.with_name(f"{self._path.name}.bindings.trie")
+
+    @property
+    def compiled(self) -> Path:
+        """Return the location of the compiled image of the registry."""
+        return self._path.with_name(f"{self._path.name}.compiled")
+
+    @property
+    def lock(self) -> FileLock:
+        return self._lock
+
+    def load(self) -> Registry:
+        """Load registry from the file, an empty one is returned if the file is missing."""
+        with profiling.phase("registry_file.load"):
+            registry, generation = self._load_base()
+            with profiling.phase("journal"):
+                journal_size = self._replay_journal(registry, generation)
+            self._stamp = generation, journal_size
+            return registry
+
+    def save(self, registry: Registry, force: bool = False) -> None:
+        """
+        Dump the whole registry to the file, refresh the snapshot and reset the journal.
+
+        Unless `force` is set, the file must be unchanged since the last `load`.
+        """
+        with self._lock, profiling.phase("registry_file.save"):
+            generation = self._read_generation()
+            if not force and self._stamp is not None and self._stamp != (generation, self._journal_size(generation)):
+                raise RegistryError(ErrorCode.StaleRegistry, "Registry was modified by another process")
+
+            generation += 1
+            with atomic_write(self._path) as file:
+                file.write(f"{HEADER_PREFIX}{generation}{SCHEMA_FIELD}{SCHEMA_VERSION}\n")
+                registry.save(file)
+
+            key = file_key(self._path)
+            if key is not None:
+                records = list(registry.records())
+                write_snapshot(self.snapshot, key, generation, records)
+                if self.compiled.exists():
+                    write_compiled(self.compiled, key, generation, records)
+
+            self.journal.unlink(missing_ok=True)
+            self._stamp = generation, 0
+
+    def compile(self) -> None:
+        """Make the compiled image, from now on it's regenerated by every full save."""
+        with self._lock:
+            self.compiled.touch()
+            self.save(self.load())
+
+    def uncompile(self) -> None:
+        """Remove the compiled image, saves don't make it anymore."""
+        with self._lock:
+            self.compiled.unlink(missing_ok=True)
+
+    def lookup(
+        self, *, name: str | None = None, email: str | None = None, cert_file: str | PathLike[str] | None = None
+    ) -> list[Account] | None:
+        """
+        Find accounts matching all given fields in the compiled image and the journal, without loading the registry.
+
+        Emails are compared case-insensitively, cert files are searched as given and resolved. **None** means the lookup
+        can't be answered this way and the caller has to search the loaded registry: the image is missing or made from
+        another version of the ini file, the journal is corrupted or no account has the cert file (it may be registered
+        under another path resolving to the same file).
+        """
+        with profiling.phase("registry_file.lookup"):
+            image = CompiledRegistry.open(self.compiled)
+            if image is None:
+                return None
+
+            with image:
+                if image.key != file_key(self._path):
+                    return None
+
+                try:
+                    journal, _ = self._read_journal(image.generation)
+                except RegistryError:
+                    return None
+
+                if name is not None:
+                    record = image.get(name)
+                    found = [record] if record is not None else []
+                elif email is not None:
+                    found = image.find_email(email)
+                elif cert_file is not None:
+                    path = Path(cert_file).expanduser()
+                    keys = dict.fromkeys((str(path), str(path.absolute()), str(path.resolve())))
+                    found = [record for key in keys for record in image.find_cert_file(key)]
+                else:
+                    return None
+
+            changes = dict(journal)  # the latest change of every account
+            records = [record for record in found if record[0] not in changes]
+            records += [record for record in changes.values() if record is not None]
+            matched = [Account.create(*record) for record in records if self._matches(record, name, email, cert_file)]
+            if not matched and cert_file is not None:
+                return None
+            return matched
+
+    def warm(self) -> None:
+        """Rebuild the snapshot and the compiled image once they're out of date, e.g. after the file was edited."""
+        key = file_key(self._path)
+        if key is None:
+            return
+
+        cached = read_snapshot(self.snapshot, key)
+        if cached is not None:
+            generation, records = cached
+        else:
+            with open(self._path, encoding="utf-8") as file:
+                generation, schema = self._parse_header(file.readline())
+                file.seek(0)
+                records = list(Registry.load(file, schema).records())
+            write_snapshot(self.snapshot, key, generation, records)
+
+        if self.compiled.exists():
+            image = CompiledRegistry.open(self.compiled)
+            if image is not None:
+                image.close()
+            if image is None or image.key != key:
+                write_compiled(self.compiled, key, generation, records)
+
+    def update(self, change: Callable[[Registry], T]) -> T:
+        """Apply `change` to the freshly loaded registry and save it, all under the lock."""
+        with self._lock:
+            registry = self.load()
+            result = change(registry)
+            self.save(registry)
+            return result
+
+    def add(self, account: Account) -> None:
+        """Record adding (or replacing) the account."""
+        self._append(["+", account.name, str(account.cert_file), account.author or "", account.email or ""])
+
+    def remove(self, name: str) -> None:
+        """Record removing the account."""
+        self._append(["-", name])
+
+    def compact(self) -> None:
+        """Fold the journal into the ini file."""
+        with self._lock:
+            self.save(self.load())
+
+    def drop(self) -> None:
+        """Delete the file with all derived data."""
+        with self._lock:
+            self._path.unlink(missing_ok=True)
+            self.snapshot.unlink(missing_ok=True)
+            self.journal.unlink(missing_ok=True)
+            self.fingerprints.unlink(missing_ok=True)
+            self.bindings.unlink(missing_ok=True)
+            self.bindings_trie.unlink(missing_ok=True)
+            self.compiled.unlink(missing_ok=True)
+            self._stamp = None
+
+    def _load_base(self) -> tuple[Registry, int]:
+        key = file_key(self._path)
+        if key is None:
+            return Registry(), 0
+
+        with profiling.phase("snapshot"):
+            cached = read_snapshot(self.snapshot, key)
+        if cached is not None:
+            generation, records = cached
+            return Registry.from_records(records), generation
+
+        with open(self._path, encoding="utf-8") as file, profiling.phase("ini"):
+            generation, schema = self._parse_header(file.readline())
+            file.seek(0)
+            # the snapshot is written once all sections are parsed, if that ever happens
+            registry = Registry.load(
+                file,
+                schema,
+                lazy=True,
+                on_parsed=partial(write_snapshot, self.snapshot, key, generation),
+            )
+        return registry, generation
+
+    def _replay_journal(self, registry: Registry, generation: int) -> int:
+        changes, size = self._read_journal(generation)
+        for name, record in changes:
+            if record is None:
+                registry.remove(name)
+            else:
+                registry.add(Account.create(*record), rewrite=True)
+        return size
+
+    def _read_journal(self, generation: int) -> tuple[Changes, int]:
+        """Return changes recorded in the journal and its size."""
+        try:
+            with open(self.journal, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return [], 0
+
+        # the last chunk is either empty or a record torn by an interrupted write
+        header, *lines = data.decode("utf-8", errors="replace").split("\n")[:-1] or [""]
+        if self._parse_journal_header(header) != generation:
+            return [], 0  # the journal was already folded into the ini file
+
+        changes: Changes = []
+        for line in lines:
+            try:
+                record = loads(line)
+            except ValueError:
+                record = None
+
+            match record:
+                case ["+", str(name), str(cert_file), str(author), str(email)]:
+                    changes.append((name, (name, cert_file, author, email)))
+                case ["-", str(name)]:
+                    changes.append((name, None))
+                case _:
+                    raise RegistryError(ErrorCode.FileCorrupted, "Registry journal is corrupted")
+
+        return changes, len(data)
+
+    def _append(self, record: list[str]) -> None:
+        with self._lock:
+            generation = self._read_generation()
+            with open(self.journal, "a+b") as file:
+                file.seek(0)
+                if self._parse_journal_header(file.readline().decode("utf-8", errors="replace")) != generation:
+                    file.truncate(0)
+                    file.write(f"{dumps(['@', generation])}\n".encode())
+                else:
+                    self._drop_torn_record(file)
+
+                before = file.seek(0, 2)
+                file.write(f"{dumps(record)}\n".encode())
+                after = file.tell()
+
+            if self._stamp == (generation, before):
+                self._stamp = generation, after
+
+            if after > self._journal_limit:
+                self.compact()
+
+    def _read_generation(self) -> int:
+        try:
+            with open(self._path, encoding="utf-8") as file:
+                return self._parse_header(file.readline())[0]
+        except FileNotFoundError:
+            return 0
+
+    def _journal_size(self, generation: int) -> int:
+        try:
+            with open(self.journal, "rb") as file:
+                if self._parse_journal_header(file.readline().decode("utf-8", errors="replace")) != generation:
+                    return 0
+                return file.seek(0, 2)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _matches(
+        record: AccountRecord, name: str | None, email: str | None, cert_file: str | PathLike[str] | None
+    ) -> bool:
+        _, record_cert_file, _, record_email = record
+        if name is not None and record[0] != name:
+            return False
+        if email is not None and record_email.casefold() != email.casefold():
+            return False
+        if cert_file is not None:
+            return Path(record_cert_file).expanduser().resolve() == Path(cert_file).expanduser().resolve()
+        return True
+
+    @staticmethod
+    def _parse_header(line: str) -> tuple[int, int]:
+        """Return the generation and the schema version."""
+        if not line.startswith(HEADER_PREFIX):
+            return 0, 1  # files written before generations were introduced
+
+        generation, _, schema = line.removeprefix(HEADER_PREFIX).partition(SCHEMA_FIELD)
+        try:
+            return int(generation), int(schema or 1)
+        except ValueError:
+            raise RegistryError(ErrorCode.FileCorrupted, "Registry file header is corrupted")
+
+    @staticmethod
+    def _parse_journal_header(line: str) -> int | None:
+        try:
+            match loads(line):
+                case ["@", int(generation)]:
+                    return generation
+        except ValueError:
+            pass
+        return None
+
+    @staticmethod
+    def _drop_torn_record(file: BinaryIO) -> None:
+        end = file.seek(0, 2)
+        if end == 0:
+            return
+
+        file.seek(end - 1)
+        if file.read(1) == b"\n":
+            return
+
+        file.seek(0)
+        data = file.read()
+        file.truncate(data.rfind(b"\n") + 1)
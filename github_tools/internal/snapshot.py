@@ -0,0 +1,42 @@
+"""Binary snapshot of parsed registry records keyed by the identity of the source file."""
+from marshal import dumps
+from marshal import loads
+from os import PathLike
+from typing import Any
+
+from github_tools.internal.account import AccountRecord
+from github_tools.internal.atomic import atomic_write
+from github_tools.internal.filestat import FileKey
+
+SNAPSHOT_VERSION = 2
+
+
+def read_snapshot(path: str | PathLike[str], key: FileKey) -> tuple[int, list[AccountRecord]] | None:
+    """Return the generation and records stored in the snapshot if it was made for the file with the given `key`."""
+    try:
+        with open(path, "rb") as file:
+            payload: Any = loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if not isinstance(payload, tuple) or len(payload) != 4:
+        return None
+
+    version, snapshot_key, generation, records = payload
+    if version != SNAPSHOT_VERSION or snapshot_key != key:
+        return None
+
+    return generation, records
+
+
+def write_snapshot(path: str | PathLike[str], key: FileKey, generation: int, records: list[AccountRecord]) -> None:
+    """
+    Store `records` made from the file with the given `key`.
+
+    The snapshot is just a cache, so failing to write it is not an error.
+    """
+    try:
+        with atomic_write(path, binary=True, sync=False) as file:
+            file.write(dumps((SNAPSHOT_VERSION, key, generation, records)))
+    except OSError:
+        pass
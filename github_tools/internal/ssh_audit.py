@@ -0,0 +1,82 @@
+"""Audit of many ssh configs at once, e.g. of every user of a shared host."""
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from os import cpu_count
+from os import PathLike
+from typing import Any
+
+from github_tools.internal.ssh_config import FragmentCache
+from github_tools.internal.ssh_config import SshConfig
+from github_tools.internal.ssh_config import SshConfigError
+
+GITHUB_HOST = "github.com"
+
+# configs handed to a worker process at once, larger chunks pay less for pickling but balance the load worse
+CHUNK_SIZE = 16
+
+DEFAULT_WORKERS = cpu_count() or 1
+
+
+@dataclass
+class AuditResult:
+    path: str
+    valid: bool
+    error: str = ""
+    github: bool = False  # the config has a **Host github.com** block
+    identity_files: list[str] = field(default_factory=list)  # IdentityFile directives applied to github.com
+
+    @property
+    def conflicting(self) -> bool:
+        """Check the directives applied to github.com name different keys, ssh offers each of them in turn."""
+        return len(set(self.identity_files)) > 1
+
+    def to_json(self) -> dict[str, Any]:
+        return {**asdict(self), "conflicting": self.conflicting}
+
+
+def audit_file(path: str) -> AuditResult:
+    """
+    Parse the config following its includes and collect GitHub entries.
+
+    Every config gets a cache of its own, so a worker doesn't keep fragments of the configs it has audited.
+    """
+    try:
+        config = SshConfig.from_path(path, FragmentCache())
+    except SshConfigError as error:
+        return AuditResult(path, valid=False, error=error.message)
+    except OSError as error:
+        return AuditResult(path, valid=False, error=f"ssh config ({path}) can't be read: {error.strerror}")
+    except UnicodeDecodeError:
+        return AuditResult(path, valid=False, error=f"ssh config ({path}) isn't UTF-8")
+
+    identity_files = [path for block in config.matching(GITHUB_HOST) for path in block.identity_files]
+    valid = config.is_valid()
+    return AuditResult(
+        path,
+        valid=valid,
+        error="" if valid else "Host without patterns",
+        github=GITHUB_HOST in config,
+        identity_files=identity_files,
+    )
+
+
+def audit_files(paths: Iterable[str | PathLike[str]], workers: int = DEFAULT_WORKERS) -> Iterator[AuditResult]:
+    """
+    Audit the configs in `workers` processes yielding results in the order of `paths` as they're ready.
+
+    Parsing is CPU-bound, so processes rather than threads are used, and paths are sent in chunks to keep the overhead
+    per config low. A single worker or a single config is audited in this process.
+    """
+    pending = [str(path) for path in paths]
+    if workers <= 1 or len(pending) <= 1:
+        yield from map(audit_file, pending)
+        return
+
+    workers = min(workers, len(pending))
+    chunk_size = max(1, min(CHUNK_SIZE, len(pending) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(audit_file, pending, chunksize=chunk_size)
@@ -1,11 +1,24 @@
 """Simple SSH config reader."""
+from collections.abc import Iterable
+from collections.abc import Iterator
 from dataclasses import dataclass
 from dataclasses import field
 from enum import auto
 from enum import Enum
+from fnmatch import translate
+from functools import cached_property
+from glob import glob
 from os import PathLike
+from pathlib import Path
+from re import compile
+from re import Pattern
+from typing import Self
 from typing import TextIO
 
+from github_tools.internal import profiling
+from github_tools.internal.filestat import file_key
+from github_tools.internal.filestat import FileKey
+
 
 class SshConfigError(Exception):
     def __init__(self, message: str) -> None:
@@ -16,9 +29,11 @@ class SshConfigError(Exception):
 class SshKeyword(Enum):
     """Values were taken from **`man ssh`**."""
 
+    AddKeysToAgent = auto()
     AddressFamily = auto()
     BatchMode = auto()
     BindAddress = auto()
+    CertificateFile = auto()
     ChallengeResponseAuthentication = auto()
     CheckHostIP = auto()
     Cipher = auto()
@@ -48,11 +63,13 @@ class SshKeyword(Enum):
     HostName = auto()
     IdentityFile = auto()
     IdentitiesOnly = auto()
+    Include = auto()
     KbdInteractiveDevices = auto()
     LocalCommand = auto()
     LocalForward = auto()
     LogLevel = auto()
     MACs = auto()
+    Match = auto()
     NoHostAuthenticationForLocalhost = auto()
     NumberOfPasswordPrompts = auto()
     PasswordAuthentication = auto()
@@ -61,6 +78,7 @@ class SshKeyword(Enum):
     PreferredAuthentications = auto()
     Protocol = auto()
     ProxyCommand = auto()
+    ProxyJump = auto()
     PubkeyAuthentication = auto()
     RekeyLimit = auto()
     RemoteForward = auto()
@@ -82,38 +100,266 @@ class SshKeyword(Enum):
     XAuthLocation = auto()
 
 
-HostInfo = dict[SshKeyword, str]
+# keywords are case-insensitive, canonical spelling is added to skip lowering in the common case
+KEYWORDS: dict[str, SshKeyword] = {
+    name: keyword for keyword in SshKeyword for name in (keyword.name, keyword.name.lower())
+}
+
+# unknown keywords are kept as is under the keyword string
+HostInfo = dict[SshKeyword | str, str]
+
+# a single parsed line: keyword and its argument(s)
+Directive = tuple[SshKeyword | str, str]
+
+# directives placed before the first Host apply to every host
+GLOBAL_HOST = "*"
+
+# the same limit ssh has for nested **Include**
+MAX_INCLUDE_DEPTH = 16
+
+
+class _Scope(Enum):
+    """Markers `_expand` puts around every included file, so blocks it opens are nested in the enclosing block."""
+
+    Enter = auto()
+    Leave = auto()
+
 
+# a directive or a scope marker with the included path
+_Item = tuple[SshKeyword | _Scope | str, str]
 
-@dataclass
+
+@dataclass(slots=True)
 class HostConfig:
     host: str
     params: HostInfo = field(default_factory=dict)
+    match: bool = False  # the block is opened by **Match**, `host` holds its criteria
+    identity_files: tuple[str, ...] = ()  # every IdentityFile in order, ssh tries all of them
+    within: "HostConfig | None" = None  # the block enclosing the **Include** this block comes from, both have to apply
+
+
+class HostIndex:
+    """
+    Precompiled Host/Match patterns of the config.
+
+    Patterns are split into tiers by the cost of matching:
+        - literal names go to a hash map;
+        - `*.domain` patterns go to a hash map of domain suffixes probed once per label of the hostname;
+        - any other wildcard pattern is compiled once into a regular expression per block.
+    Negated patterns of a block are compiled into a single expression checked only for candidate blocks.
+
+    **Match** blocks are supported for the `all`, `host` and `originalhost` criteria. Blocks relying on anything else
+    (exec, user, canonical, ...) can't be evaluated statically and are never applied.
+    """
+
+    def __init__(self, blocks: list[HostConfig]) -> None:
+        self._blocks = blocks
+        self._always: list[int] = []
+        self._literal: dict[str, list[int]] = {}
+        self._suffix: dict[str, list[int]] = {}
+        self._wildcard: list[tuple[int, Pattern[str]]] = []
+        self._negated: dict[int, Pattern[str]] = {}
+        self._nested = any(block.within is not None for block in blocks)
+
+        for index, block in enumerate(blocks):
+            patterns = self._block_patterns(block)
+            if patterns is not None:
+                self._add(index, patterns)
+
+    def lookup(self, hostname: str) -> list[HostConfig]:
+        """Return blocks applied to the `hostname` in the config order."""
+        name = hostname.lower()
+        candidates = set(self._always)
+        candidates.update(self._literal.get(name, ()))
+        if self._suffix:
+            dot = name.find(".")
+            while dot != -1:
+                candidates.update(self._suffix.get(name[dot:], ()))
+                dot = name.find(".", dot + 1)
+        candidates.update(index for index, pattern in self._wildcard if pattern.match(name))
+
+        negated = self._negated
+        blocks = [
+            self._blocks[index]
+            for index in sorted(candidates)
+            if index not in negated or not negated[index].match(name)
+        ]
+        if not self._nested:
+            return blocks
+
+        # a block from an include placed in another block applies only along with it, the enclosing one comes first
+        applied: set[int] = set()
+        for block in blocks:
+            if block.within is None or id(block.within) in applied:
+                applied.add(id(block))
+        return [block for block in blocks if id(block) in applied]
+
+    @staticmethod
+    def _block_patterns(block: HostConfig) -> list[str] | None:
+        if not block.match:
+            return block.host.split()
+
+        criteria = block.host.split()
+        if [criterion.lower() for criterion in criteria] == ["all"]:
+            return ["*"]
+
+        patterns: list[str] = []
+        for criterion, argument in zip(criteria[::2], criteria[1::2]):
+            if criterion.lower() not in ("host", "originalhost"):
+                return None
+            patterns.extend(argument.split(","))
+        return patterns if len(criteria) % 2 == 0 else None
+
+    def _add(self, index: int, patterns: list[str]) -> None:
+        positive, negative = [], []
+        for pattern in patterns:
+            if pattern.startswith("!"):
+                negative.append(pattern[1:].lower())
+            else:
+                positive.append(pattern.lower())
+
+        wildcards = []
+        for pattern in dict.fromkeys(positive):
+            if pattern == "*":
+                self._always.append(index)
+            elif "*" not in pattern and "?" not in pattern:
+                self._literal.setdefault(pattern, []).append(index)
+            elif pattern.startswith("*.") and "*" not in pattern[1:] and "?" not in pattern:
+                self._suffix.setdefault(pattern[1:], []).append(index)
+            else:
+                wildcards.append(pattern)
+
+        if wildcards:
+            self._wildcard.append((index, self._compile(wildcards)))
+        if negative:
+            self._negated[index] = self._compile(negative)
+
+    @staticmethod
+    def _compile(patterns: list[str]) -> Pattern[str]:
+        return compile("|".join(translate(pattern) for pattern in patterns))
+
+
+class FragmentCache:
+    """
+    Parsed config files keyed by path.
+
+    Every access compares the file identity (inode, mtime and size) with the cached one, so only changed files are
+    parsed again.
+    """
+
+    def __init__(self) -> None:
+        self._fragments: dict[Path, tuple[FileKey, list[Directive]]] = {}
+        self.misses = 0
+
+    def directives(self, path: Path) -> tuple[FileKey, list[Directive]]:
+        """Return the identity of the file along with its directives."""
+        key = file_key(path)
+        if key is None:
+            raise SshConfigError(f"ssh config ({path!s}) can't be read")
+
+        cached = self._fragments.get(path)
+        if cached is not None and cached[0] == key:
+            return cached
+
+        with open(path, encoding="utf-8") as file, profiling.phase("ssh_config.tokenize"):
+            directives = list(SshConfig._tokenize(file))
+        profiling.count("ssh config files parsed")
+        self.misses += 1
+        self._fragments[path] = key, directives
+        return key, directives
+
+    def clear(self) -> None:
+        self._fragments.clear()
+
+
+# shared by configs loaded from files unless a dedicated cache is given
+FRAGMENTS = FragmentCache()
 
 
 class SshConfig:
     def __init__(self, file: TextIO) -> None:
-        self._hosts: dict[str, HostInfo] = {config.host: config.params for config in self._load(file)}
+        """Parse the config from the stream, **Include** directives are kept as is since there's no base to resolve."""
+        with profiling.phase("ssh_config.parse"):
+            self._setup(self._tokenize(file))
+
+    @classmethod
+    def from_path(cls, path: str | PathLike[str], cache: FragmentCache = FRAGMENTS) -> Self:
+        """
+        Load the config from the file following **Include** directives.
+
+        Relative includes are resolved against the directory of the config (*~/.ssh* for the user config), globs are
+        expanded in sorted order and files matching nothing are skipped like ssh does. Every file goes through the
+        `cache`, so after a change only the changed fragments are parsed again.
+        """
+        root = Path(path).expanduser().absolute()
+        config = cls.__new__(cls)
+        sources: dict[Path, FileKey | None] = {}
+        with profiling.phase("ssh_config.load"):
+            config._setup(cls._expand(root, root.parent, cache, [], sources))
+        config._sources = sources
+        return config
+
+    @property
+    def sources(self) -> list[Path]:
+        """Return files (and directories of include globs) the config was loaded from."""
+        return list(self._sources)
+
+    def is_stale(self) -> bool:
+        """Check any of the source files has changed since the config was loaded."""
+        return any(file_key(path) != key for path, key in self._sources.items())
+
+    def _setup(self, directives: Iterable[_Item]) -> None:
+        self._sources: dict[Path, FileKey | None] = {}
+        self._blocks = self._build(directives)
+
+    @property
+    def blocks(self) -> list[HostConfig]:
+        """Return Host/Match blocks in the config order."""
+        return list(self._blocks)
 
     @property
     def hosts(self) -> list[str]:
         """Return list of hosts."""
-        return list(self._hosts.keys())
+        return list(dict.fromkeys(block.host for block in self._blocks if not block.match))
 
     def get(self, host: str) -> HostInfo | None:
-        """Get the `host` config is present otherwise **None**."""
-        return self._hosts.get(host)
+        """Get the `host` config is present otherwise **None**, the last block wins if the host is repeated."""
+        for block in reversed(self._blocks):
+            if not block.match and block.host == host:
+                return block.params
+        return None
+
+    def resolve(self, hostname: str) -> HostInfo:
+        """
+        Get the effective config for the `hostname` the way **ssh -G** does.
+
+        Every Host/Match block applying to the `hostname` is merged in the config order, the first obtained value of
+        each keyword wins. **HostName** defaults to the `hostname` and expands the `%h` token.
+        """
+        hostname = hostname.lower()
+        merged: HostInfo = {}
+        for block in self.matching(hostname):
+            for option, value in block.params.items():
+                merged.setdefault(option, value)
+
+        merged[SshKeyword.HostName] = merged.get(SshKeyword.HostName, hostname).replace("%h", hostname)
+        return merged
+
+    def matching(self, hostname: str) -> list[HostConfig]:
+        """Return Host/Match blocks applying to the `hostname` in the config order."""
+        return self._index.lookup(hostname)
+
+    @cached_property
+    def _index(self) -> HostIndex:
+        return HostIndex(self._blocks)
 
     def __contains__(self, host: str) -> bool:
         """Check for config for the `host`."""
-        return host in self._hosts
+        return any(not block.match and block.host == host for block in self._blocks)
 
     def is_valid(self) -> bool:
         """Check the correctness of the config."""
-        if not self._hosts:
-            return True  # empty config is ok
-
-        return all(self._hosts.keys())
+        return all(block.host for block in self._blocks if not block.match)  # empty config is ok
 
     @classmethod
     def verify_file(cls, path: str | PathLike[str]) -> bool:
@@ -124,39 +370,118 @@ class SshConfig:
         Maybe it's much better to call ```ssh -T -F path```
         """
         try:
-            with open(path, encoding="utf-8") as file:
-                return cls(file).is_valid()
+            return cls.from_path(path).is_valid()
         except SshConfigError:
             return False
 
     @classmethod
-    def _load(cls, file: TextIO) -> list[HostConfig]:
+    def _expand(
+        cls, path: Path, base: Path, cache: FragmentCache, stack: list[Path], sources: dict[Path, FileKey | None]
+    ) -> Iterator[_Item]:
+        if path in stack:
+            raise SshConfigError(f"ssh config include cycle: {' -> '.join(map(str, [*stack, path]))}")
+        if len(stack) >= MAX_INCLUDE_DEPTH:
+            raise SshConfigError(f"ssh config includes are nested too deeply ({path!s})")
+
+        key, directives = cache.directives(path)
+        sources[path] = key
+        stack.append(path)
+        for option, value in directives:
+            if option is not SshKeyword.Include:
+                yield option, value
+                continue
+
+            for pattern in value.split():
+                location = base / Path(pattern).expanduser()
+                sources.setdefault(location.parent, file_key(location.parent))
+                for included in sorted(glob(str(location))):
+                    if Path(included).is_dir():
+                        continue
+                    yield _Scope.Enter, included
+                    yield from cls._expand(Path(included), base, cache, stack, sources)
+                    yield _Scope.Leave, included
+        stack.pop()
+
+    @staticmethod
+    def _build(directives: Iterable[_Item]) -> list[HostConfig]:
+        """
+        Group directives into Host/Match blocks.
+
+        An included file continues the block its **Include** is placed in, blocks it opens apply only along with that
+        block, and after the file the enclosing block goes on like ssh restores its condition.
+        """
+        # members are looked up once, getting an enum attribute costs more than the rest of the loop
+        host, match, identity_file = SshKeyword.Host, SshKeyword.Match, SshKeyword.IdentityFile
+
         hosts: list[HostConfig] = []
+        block: HostConfig | None = None
+        within: HostConfig | None = None  # the block enclosing the current included file
+        resumed: HostConfig | None = None  # the block to go on with after an included file opened blocks of its own
+        scopes: list[tuple[HostConfig | None, HostConfig | None]] = []
+        for option, value in directives:
+            if option is host or option is match:
+                block, resumed = HostConfig(value, match=option is match, within=within), None
+                hosts.append(block)
+                continue
+            if isinstance(option, _Scope):
+                if option is _Scope.Enter:
+                    if block is None and resumed is not None:
+                        block = HostConfig(resumed.host, match=resumed.match, within=resumed.within)
+                        hosts.append(block)
+                    scopes.append((within, block))
+                    within = block
+                else:
+                    within, enclosing = scopes.pop()
+                    if block is not enclosing:
+                        block, resumed = None, enclosing
+                continue
 
-        # empty lines and lines starting with '#' are comments.
-        filter_comments = (line.strip() for line in file if not line.startswith("#") and line.strip())
-        parser = (cls._parse(line) for line in filter_comments)
-        for option, value in parser:
-            match option:
-                case SshKeyword.Host:
-                    hosts.append(HostConfig(value))
-                case _:
-                    hosts[-1].params[option] = value
+            if block is None:
+                if resumed is None:
+                    block = HostConfig(GLOBAL_HOST, within=within)
+                else:
+                    block = HostConfig(resumed.host, match=resumed.match, within=resumed.within)
+                hosts.append(block)
+            block.params.setdefault(option, value)  # ssh keeps the first value here as well
+            if option is identity_file:
+                block.identity_files += (value,)
 
         return hosts
 
     @staticmethod
-    def _parse(line: str) -> tuple[SshKeyword, str]:
+    def _tokenize(lines: Iterable[str]) -> Iterator[Directive]:
         """
-        Parse ssh config line.
+        Parse ssh config lines in a single pass.
 
         Rules:
-            - each line begins with a keyword, followed by argument(s).
+            - empty lines and lines starting with '#' are comments.
+            - each line begins with a keyword (case-insensitive), followed by argument(s).
             - configuration options may be separated by whitespace or optional whitespace and exactly one =.
             - arguments may be enclosed in double quotes (") in order to specify arguments that contain spaces.
         """
-        option, separator, value = line.partition(" ")
-        try:
-            return SshKeyword[option], value.strip('=" ')
-        except KeyError:
-            raise SshConfigError("ssh config contains unknown keyword")
+        keywords = KEYWORDS
+        for line in lines:
+            line = line.strip()
+            if not line or line[0] == "#":
+                continue
+
+            option, _, value = line.partition(" ")
+            if not value or value[0] in " \t=" or "=" in option:
+                # rare separators: tabs, '=' or several spaces
+                parts = line.split(None, 1)
+                option = parts[0]
+                separator = option.find("=")
+                if separator == 0:
+                    raise SshConfigError(f"ssh config contains malformed line ({line})")
+                elif separator > 0:
+                    option, value = option[:separator], line.partition("=")[2].lstrip()
+                elif len(parts) == 1:
+                    value = ""
+                elif parts[1][0] == "=":
+                    value = parts[1][1:].lstrip()
+                else:
+                    value = parts[1]
+
+            if len(value) > 1 and value[0] == '"' and value[-1] == '"':
+                value = value[1:-1]
+            yield keywords.get(option) or keywords.get(option.lower()) or option, value
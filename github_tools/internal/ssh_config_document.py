@@ -0,0 +1,228 @@
+"""Lossless SSH config editor."""
+from dataclasses import dataclass
+from os import PathLike
+from pathlib import Path
+from re import compile
+from re import IGNORECASE
+from re import Match
+from re import MULTILINE
+from typing import Self
+
+from github_tools.internal.atomic import atomic_write
+from github_tools.internal.ssh_config import KEYWORDS
+from github_tools.internal.ssh_config import SshKeyword
+
+_SPACES = b" \t"
+
+# a directive line: indentation, keyword, whitespace or optional whitespace around exactly one '=', argument(s)
+_DIRECTIVE = compile(rb"^[ \t]*([^\s#=][^\s=]*)(?:[ \t]*=[ \t]*|[ \t]+)?([^\r\n]*?)[ \t]*\r?$", MULTILINE)
+
+# the same for lines opening a block, only these are scanned up front
+_HEADER = compile(rb"^[ \t]*(host|match)(?:[ \t]*=[ \t]*|[ \t]+)([^\r\n]*?)[ \t]*\r?$", MULTILINE | IGNORECASE)
+
+
+@dataclass(frozen=True, slots=True)
+class Directive:
+    keyword: SshKeyword | str
+    start: int  # beginning of the line
+    end: int  # end of the line including the line break
+    value_start: int
+    value_end: int
+
+    @property
+    def line(self) -> slice:
+        return slice(self.start, self.end)
+
+    @property
+    def value(self) -> slice:
+        return slice(self.value_start, self.value_end)
+
+
+@dataclass(slots=True)
+class Block:
+    header: Directive
+    host: str
+    body_end: int  # the beginning of the next block
+    directives: list[Directive] | None = None  # scanned on demand
+
+
+class SshConfigDocument:
+    """
+    SSH config kept as the original bytes plus the byte spans of every block and directive.
+
+    Only **Host**/**Match** lines are scanned when the document is loaded, directives of a block are scanned when the
+    block is accessed. Changes are recorded as patches of the affected ranges only: a replaced value, a line inserted
+    after the last directive of a block or a block appended to the end. Everything else (comments, indentation, blank
+    lines, line breaks, unknown keywords) is written back byte for byte.
+    """
+
+    def __init__(self, content: bytes) -> None:
+        self._reset(content)
+
+    @classmethod
+    def read(cls, path: str | PathLike[str]) -> Self:
+        """Load the document, a missing file is an empty document."""
+        try:
+            return cls(Path(path).read_bytes())
+        except FileNotFoundError:
+            return cls(b"")
+
+    @property
+    def hosts(self) -> list[str]:
+        """Return values of **Host** lines in the file order."""
+        return [block.host for block in self._blocks if block.header.keyword is SshKeyword.Host]
+
+    @property
+    def modified(self) -> bool:
+        return bool(self._replacements or self._insertions or self._appended)
+
+    def get(self, host: str, keyword: SshKeyword) -> str | None:
+        """Get the first value of the `keyword` in the **Host** `host` block."""
+        block = self._find_block(host)
+        directive = block and self._find_directive(block, keyword)
+        if not directive:
+            return None
+        return self._unquote(self._content[directive.value].decode())
+
+    def set(self, host: str, keyword: SshKeyword, value: str) -> bool:
+        """
+        Set the `keyword` of the **Host** `host` block to `value`, the block is appended if it's missing.
+
+        Only the value of the existing directive is replaced, otherwise a single line is inserted after the last
+        directive of the block. Returns **False** if the value is already set.
+        """
+        encoded = self._quote(value).encode()
+        block = self._find_block(host)
+        if block is None:
+            self._appended.setdefault(host, {})[keyword] = encoded
+            return True
+
+        directive = self._find_directive(block, keyword)
+        if directive is None:
+            self._insertions.setdefault(self._block_end(block), {})[keyword] = encoded
+            return True
+
+        if self._content[directive.value] == encoded:
+            self._replacements.pop(directive.value_start, None)
+            return False
+
+        self._replacements[directive.value_start] = directive.value_end, encoded
+        return True
+
+    def render(self) -> bytes:
+        """Return the content with all changes applied."""
+        if not self.modified:
+            return self._content
+
+        size = len(self._content)
+        patches = [(start, end, replacement) for start, (end, replacement) in self._replacements.items()]
+        for position, values in self._insertions.items():
+            lines = b"".join(self._line(self._indent(position), keyword, value) for keyword, value in values.items())
+            if not self._content[:position].endswith(b"\n"):
+                lines = self._newline + lines
+            patches.append((position, position, lines))
+        for host, values in self._appended.items():
+            lines = b"".join(self._line(self._indent(None), keyword, value) for keyword, value in values.items())
+            separator = self._newline if size and not self._content.endswith(b"\n") else b""
+            patches.append((size, size, b"%sHost %s%s%s" % (separator, host.encode(), self._newline, lines)))
+            size = -1  # the separator is needed only once
+
+        view = memoryview(self._content)
+        chunks: list[bytes | memoryview] = []
+        position = 0
+        for start, end, replacement in sorted(patches, key=lambda patch: patch[0]):
+            chunks.append(view[position:start])
+            chunks.append(replacement)
+            position = end
+        chunks.append(view[position:])
+        return b"".join(chunks)
+
+    def write(self, path: str | PathLike[str]) -> bool:
+        """
+        Atomically replace the file with the patched content, nothing is written if there are no changes.
+
+        Replacing the file is the only way to stay atomic, so the content is written in full, but it's a single
+        sequential write assembled from slices of the original bytes. A symlinked config (e.g. one managed in a dotfiles
+        repository) is followed, so the file it points to is replaced and the link is kept.
+        """
+        if not self.modified:
+            return False
+
+        content = self.render()
+        with atomic_write(Path(path).resolve(), binary=True) as file:
+            file.write(content)
+
+        self._reset(content)
+        return True
+
+    def _reset(self, content: bytes) -> None:
+        self._content = content
+        self._blocks = self._scan()
+        self._replacements: dict[int, tuple[int, bytes]] = {}
+        self._insertions: dict[int, dict[SshKeyword, bytes]] = {}
+        self._appended: dict[str, dict[SshKeyword, bytes]] = {}
+        self._newline = b"\r\n" if content.find(b"\r\n") != -1 else b"\n"
+
+    def _line(self, indent: bytes, keyword: SshKeyword, value: bytes) -> bytes:
+        return b"%s%s %s%s" % (indent, keyword.name.encode(), value, self._newline)
+
+    def _find_block(self, host: str) -> Block | None:
+        for block in self._blocks:
+            if block.header.keyword is SshKeyword.Host and block.host == host:
+                return block
+        return None
+
+    def _find_directive(self, block: Block, keyword: SshKeyword) -> Directive | None:
+        return next((directive for directive in self._directives(block) if directive.keyword is keyword), None)
+
+    def _directives(self, block: Block) -> list[Directive]:
+        if block.directives is None:
+            matches = _DIRECTIVE.finditer(self._content, block.header.end, block.body_end)
+            block.directives = [self._directive(match) for match in matches]
+        return block.directives
+
+    def _block_end(self, block: Block) -> int:
+        """Return the offset right after the last directive of the block."""
+        directives = self._directives(block)
+        return (directives[-1] if directives else block.header).end
+
+    def _indent(self, position: int | None) -> bytes:
+        """Reuse the indentation of the block ending at `position` (or of the first block) for new lines."""
+        candidates = [block for block in self._blocks[:1] if position is None]
+        if position is not None:
+            candidates = [block for block in self._blocks if block.header.end <= position <= block.body_end][-1:]
+            candidates += self._blocks[:1]
+
+        sample = next((self._directives(block)[0] for block in candidates if self._directives(block)), None)
+        if sample is None:
+            return b"    "
+
+        line = self._content[sample.line]
+        indent_size = len(line) - len(line.lstrip(_SPACES))
+        return line[:indent_size]
+
+    @staticmethod
+    def _quote(value: str) -> str:
+        return f'"{value}"' if " " in value or "\t" in value else value
+
+    @staticmethod
+    def _unquote(value: str) -> str:
+        return value[1:-1] if len(value) > 1 and value[0] == '"' and value[-1] == '"' else value
+
+    def _directive(self, match: Match[bytes]) -> Directive:
+        end = match.end()
+        if end < len(self._content):
+            end += 1  # the line break
+
+        name = match.group(1).decode(errors="replace")
+        keyword = KEYWORDS.get(name) or KEYWORDS.get(name.lower()) or name
+        value_start, value_end = match.span(2)
+        return Directive(keyword, match.start(), end, value_start, value_end)
+
+    def _scan(self) -> list[Block]:
+        blocks: list[Block] = []
+        for match in _HEADER.finditer(self._content):
+            if blocks:
+                blocks[-1].body_end = match.start()
+            blocks.append(Block(self._directive(match), match.group(2).decode(errors="replace"), len(self._content)))
+        return blocks
@@ -3,6 +3,9 @@ from os import PathLike
 from pathlib import Path
 from typing import Self
 
+from github_tools.internal import profiling
+from github_tools.internal.atomic import atomic_symlink
+
 PathType = str | PathLike[str] | Path
 
 
@@ -17,17 +20,31 @@ class Symlink:
 
     @classmethod
     def make(cls, *, path: PathType, to: PathType, override: bool = False) -> Self:
+        """Create the link, with `override` an existing file or link is atomically replaced by it."""
         location = Path(path)
-        if override and location.exists():
-            location.unlink()
-
         target = Path(to)
         if target.is_dir():
             raise ValueError(f"target ({target!s}) is not file")
 
-        location.symlink_to(target, target_is_directory=False)
+        with profiling.phase("symlink.make"):
+            if override:
+                atomic_symlink(location, target)
+            else:
+                location.symlink_to(target, target_is_directory=False)
         return cls(location)
 
+    @classmethod
+    def point(cls, path: PathType, to: PathType) -> Self:
+        """Point the link at `path` to `to` creating (or recreating a broken) link if necessary."""
+        location = Path(path)
+        if location.is_symlink() and location.is_file():
+            return cls(location).switch(to)
+
+        if location.exists() and not location.is_symlink():
+            raise ValueError(f"path ({path!s}) is not symlink")
+
+        return cls.make(path=location, to=Path(to).resolve(strict=True), override=True)
+
     @property
     def path(self) -> Path:
         return self._path
@@ -41,12 +58,13 @@ class Symlink:
         return self._path.resolve(strict=True)
 
     def switch(self, to: PathType, /) -> Self:
+        """Point the link to `to`, the path resolves to either the old or the new target at any moment."""
         target = Path(to).resolve(strict=True)
         if target.is_dir():
             raise ValueError(f"target ({target!s}) is not file")
 
-        self._path.unlink()
-        self._path.symlink_to(target, target_is_directory=False)
+        with profiling.phase("symlink.switch"):
+            atomic_symlink(self._path, target)
 
         return self
 
@@ -0,0 +1,96 @@
+"""Parallel account validation."""
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from queue import Empty
+from queue import SimpleQueue
+from threading import Event
+from threading import Thread
+from time import monotonic
+from typing import TypeVar
+
+from github_tools.internal.account import Account
+
+T = TypeVar("T")
+
+# checks stat files, which is I/O bound, so it's fine to have more threads than cores
+DEFAULT_WORKERS = 16
+DEFAULT_TIMEOUT = 5.0
+
+# threads replacing the stuck ones are limited to this many times the workers, so a dead mount can't pile them up
+SPAWN_LIMIT = 2
+
+
+def check_accounts(
+    accounts: Iterable[Account],
+    check: Callable[[Account], T] = Account.is_valid,  # type: ignore[assignment]
+    workers: int = DEFAULT_WORKERS,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Iterator[tuple[Account, T | None]]:
+    """
+    Run `check` for every account on a bounded pool of threads and yield results as soon as they are ready.
+
+    A check running longer than `timeout` seconds is reported with **None** as the result. The thread stuck in it (a
+    hung NFS stat can't be interrupted) is abandoned and replaced, so the pool keeps `workers` threads busy and the
+    process isn't kept alive by it on exit. At most `SPAWN_LIMIT` times `workers` threads are ever started: once all of
+    them are stuck, the accounts left are reported with **None** too.
+    """
+    pending = list(accounts)
+    tasks: SimpleQueue[int | None] = SimpleQueue()
+    results: SimpleQueue[tuple[int, T | None, BaseException | None]] = SimpleQueue()
+    started: dict[int, float] = {}
+    abandoned: set[int] = set()
+    spawned = 0
+    stopped = Event()
+
+    def work() -> None:
+        while not stopped.is_set() and (index := tasks.get()) is not None:
+            started[index] = monotonic()
+            try:
+                results.put((index, check(pending[index]), None))
+            except BaseException as error:
+                results.put((index, None, error))
+
+    def spawn() -> None:
+        nonlocal spawned
+        if spawned < SPAWN_LIMIT * workers:
+            spawned += 1
+            Thread(target=work, name="check-accounts", daemon=True).start()
+
+    for index in range(len(pending)):
+        tasks.put(index)
+    for _ in range(min(workers, len(pending))):
+        spawn()
+
+    waiting = set(range(len(pending)))
+    try:
+        while waiting:
+            running = [started[index] for index in waiting if index in started]
+            wait = max(0.0, min(running) + timeout - monotonic()) if running else timeout
+            try:
+                index, result, error = results.get(timeout=wait)
+            except Empty:
+                pass
+            else:
+                abandoned.discard(index)  # the thread got unstuck and goes on with other tasks
+                if index in waiting:
+                    waiting.discard(index)
+                    if error is not None:
+                        raise error
+                    yield pending[index], result
+
+            now = monotonic()
+            for index in [index for index in waiting if index in started and now - started[index] > timeout]:
+                waiting.discard(index)
+                abandoned.add(index)
+                spawn()
+                yield pending[index], None
+
+            if waiting and len(abandoned) >= spawned:
+                for index in sorted(waiting):
+                    yield pending[index], None
+                return
+    finally:
+        stopped.set()
+        for _ in range(spawned):
+            tasks.put(None)
@@ -0,0 +1,392 @@
+"""Watching the files behind the registry, the identity link and the ssh config for changes made outside the tool."""
+from collections.abc import Callable
+from collections.abc import Iterable
+from ctypes import CDLL
+from ctypes import get_errno
+from os import close
+from os import fsdecode
+from os import fsencode
+from os import lstat
+from os import read
+from os import readlink
+from os import strerror
+from pathlib import Path
+from select import select
+from struct import Struct
+from time import monotonic
+from time import sleep
+
+from github_tools.internal.account import AccountRecord
+from github_tools.internal.bindings import Bindings
+from github_tools.internal.filestat import file_key
+from github_tools.internal.keys import FingerprintCache
+from github_tools.internal.keys import inspect_key
+from github_tools.internal.keys import KeyStatus
+from github_tools.internal.registry import RegistryError
+from github_tools.internal.registry_file import RegistryFile
+from github_tools.internal.ssh_config import FragmentCache
+from github_tools.internal.ssh_config import HostInfo
+from github_tools.internal.ssh_config import SshConfig
+from github_tools.internal.ssh_config import SshConfigError
+from github_tools.internal.ssh_config import SshKeyword
+from github_tools.internal.symlink import Symlink
+
+# inotify(7) constants
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_CLOEXEC = 0x80000
+
+# files are usually replaced by a rename, so directories are watched for entries being written, moved or deleted
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+
+EVENT = Struct("iIII")
+READ_SIZE = 64 * 1024
+
+# events coming within this time of each other are handled together (editors write files in several steps)
+DEBOUNCE = 0.05
+
+POLL_INTERVAL = 1.0
+
+# (host, Match block or not, occurrence of the same host)
+BlockKey = tuple[str, bool, int]
+
+
+class InotifyWatcher:
+    """
+    Changes of the watched paths reported by Linux inotify.
+
+    Parent directories of the paths are watched rather than the paths themselves, so replacing a file by a rename is
+    noticed as well. Paths in missing directories aren't watched until the next `watch` call finds them.
+    """
+
+    def __init__(self) -> None:
+        self._libc = CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(get_errno(), strerror(get_errno()))
+
+        self._paths: set[Path] = set()
+        self._watches: dict[Path, int] = {}
+        self._directories: dict[int, Path] = {}
+
+    def watch(self, paths: Iterable[Path]) -> None:
+        """Replace the watched paths, directories among them report changes of any of their entries."""
+        self._paths = set(paths)
+        directories = {path.parent for path in self._paths} | {path for path in self._paths if path.is_dir()}
+        for directory in self._watches.keys() - directories:
+            descriptor = self._watches.pop(directory)
+            self._directories.pop(descriptor, None)
+            self._libc.inotify_rm_watch(self._fd, descriptor)
+
+        for directory in directories - self._watches.keys():
+            descriptor = self._libc.inotify_add_watch(self._fd, fsencode(directory), WATCH_MASK)
+            if descriptor >= 0:
+                self._watches[directory] = descriptor
+                self._directories[descriptor] = directory
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """Block until any of the watched paths changes and return the changed ones, the set is empty on timeout."""
+        changed: set[Path] = set()
+        ready, _, _ = select([self._fd], [], [], timeout)
+        while ready:
+            changed |= self._parse(read(self._fd, READ_SIZE))
+            ready, _, _ = select([self._fd], [], [], DEBOUNCE)
+        return changed
+
+    def close(self) -> None:
+        close(self._fd)
+
+    def _parse(self, data: bytes) -> set[Path]:
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = EVENT.unpack_from(data, offset)
+            start = offset + EVENT.size
+            offset = start + length
+            name = fsdecode(data[start:offset].rstrip(b"\0"))
+
+            if mask & IN_Q_OVERFLOW:
+                return set(self._paths)  # events were lost
+            directory = self._directories.get(descriptor)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:  # the directory is gone
+                self._directories.pop(descriptor)
+                self._watches.pop(directory, None)
+                continue
+
+            path = directory / name
+            if path in self._paths:
+                changed.add(path)
+            if directory in self._paths:
+                changed.add(directory)
+        return changed
+
+
+class PollingWatcher:
+    """Changes of the watched paths found by comparing their `lstat` and `stat` results every `interval` seconds."""
+
+    def __init__(self, interval: float = POLL_INTERVAL) -> None:
+        self._interval = interval
+        self._signatures: dict[Path, tuple[object, ...]] = {}
+
+    def watch(self, paths: Iterable[Path]) -> None:
+        signatures = self._signatures
+        self._signatures = {path: signatures[path] if path in signatures else self._signature(path) for path in paths}
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            changed = set()
+            for path, signature in self._signatures.items():
+                current = self._signature(path)
+                if current != signature:
+                    self._signatures[path] = current
+                    changed.add(path)
+            if changed:
+                return changed
+
+            if deadline is not None and monotonic() >= deadline:
+                return changed
+            sleep(self._interval if deadline is None else max(0.0, min(self._interval, deadline - monotonic())))
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _signature(path: Path) -> tuple[object, ...]:
+        try:
+            info = lstat(path)
+        except OSError:
+            return ()
+        return info.st_ino, info.st_mtime_ns, info.st_size, info.st_mode, file_key(path)
+
+
+Watcher = InotifyWatcher | PollingWatcher
+
+
+def create_watcher(polling: bool = False, interval: float = POLL_INTERVAL) -> Watcher:
+    """Use inotify unless `polling` is requested or the platform doesn't have it."""
+    if not polling:
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError, TypeError):
+            pass
+    return PollingWatcher(interval)
+
+
+class Monitor:
+    """
+    Reaction to changes of the files the tool depends on.
+
+    Only what the changed files affect is validated again: accounts whose cert files changed, every changed account once
+    the registry changes, changed Host/Match blocks once the ssh config changes. A dangling identity link is pointed
+    back to the account it pointed to last time if that account's cert file is still there (with `repair`), otherwise
+    it's reported. Derived files (the snapshot, the compiled registry, the bindings trie and the fingerprint cache) are
+    rebuilt as soon as they go out of date. Findings are passed to `report` as messages.
+    """
+
+    def __init__(
+        self, config: Path, link: Path, ssh_config: Path, report: Callable[[str], None], repair: bool = True
+    ) -> None:
+        self._storage = RegistryFile(config)
+        self._bindings = Bindings(self._storage)
+        self._fingerprints = FingerprintCache(self._storage.fingerprints)
+        self._link = link.expanduser().absolute()
+        self._ssh_config_path = ssh_config.expanduser().absolute()
+        self._fragments = FragmentCache()
+        self._report = report
+        self._repair = repair
+
+        self._records: dict[str, AccountRecord] | None = None
+        self._statuses: dict[str, KeyStatus] = {}
+        self._active: str | None = None  # the account the link pointed to last time it was fine
+        self._link_problem: str | None = None
+        self._ssh_sources: list[Path] = []
+        self._blocks: dict[BlockKey, HostInfo] = {}
+        self._ssh_problems: dict[BlockKey | None, list[str]] = {}
+
+    def paths(self) -> set[Path]:
+        """Return the paths to watch, they change as accounts and includes are added or removed."""
+        registry = {self._storage.path, self._storage.journal, self._storage.bindings}
+        certs = {self._cert_path(record) for record in (self._records or {}).values()}
+        return {*registry, *certs, self._link, self._ssh_config_path, *self._ssh_sources}
+
+    def start(self) -> None:
+        """Load and validate everything, only problems are reported."""
+        self._reload_registry()
+        self._reload_ssh_config()
+        self._check_link()
+        self._fingerprints.save()
+
+    def handle(self, changed: set[Path]) -> None:
+        """React to changes of the paths."""
+        validated: set[str] = set()
+        if changed & {self._storage.path, self._storage.journal, self._storage.bindings}:
+            validated = self._reload_registry()
+        if self._records:
+            self._validate(
+                [
+                    name
+                    for name, record in self._records.items()
+                    if name not in validated and self._cert_path(record) in changed
+                ]
+            )
+
+        if changed & {self._ssh_config_path, *self._ssh_sources}:
+            self._reload_ssh_config()
+
+        self._check_link()
+        self._fingerprints.save()
+
+    def _reload_registry(self) -> set[str]:
+        """Load the registry again and validate changed accounts, their names are returned."""
+        try:
+            registry = self._storage.load()
+            records = {record[0]: record for record in registry.records()}
+            self._storage.warm()
+            if self._bindings.path.exists():
+                self._bindings.compile(registry)
+        except RegistryError as error:
+            self._report(f"can't load accounts: {error.message}")
+            return set()
+        except OSError as error:
+            self._report(f"can't load accounts: {error.strerror}")
+            return set()
+
+        previous = self._records
+        self._records = records
+        for name in (previous or {}).keys() - records.keys():
+            self._statuses.pop(name, None)
+            self._report(f"account ({name}) was removed")
+
+        changed = [name for name, record in records.items() if previous is None or previous.get(name) != record]
+        for name in changed:
+            if previous is not None and name not in previous:
+                self._report(f"account ({name}) was added")
+        self._validate(changed)
+        return set(changed)
+
+    def _validate(self, names: list[str]) -> None:
+        for name in names:
+            cert_file = self._cert_path(self._records[name])  # type: ignore[index]
+            status = inspect_key(cert_file)
+            previous = self._statuses.get(name)
+            self._statuses[name] = status
+            if status is KeyStatus.Valid:
+                info = self._fingerprints.get(cert_file)  # keeps the cache warm
+                if previous is not None and previous is not KeyStatus.Valid:
+                    self._report(f"account ({name}) is valid" + (f" ({info})" if info else ""))
+            elif status is not previous:
+                self._report(f"account ({name}) is invalid: {status.value}")
+
+    def _check_link(self) -> None:
+        try:
+            target = self._link.parent / readlink(self._link)
+        except OSError:
+            self._flag_link(None)  # there is no link until the first switch
+            return
+
+        if target.exists():
+            self._active = self._account_of(target) or self._active
+            self._flag_link(None)
+            return
+
+        record = (self._records or {}).get(self._active or "")
+        replacement = self._cert_path(record) if record else None
+        if self._repair and replacement is not None and replacement.exists():
+            try:
+                Symlink.point(self._link, replacement)
+            except (OSError, ValueError) as error:
+                self._flag_link(f"identity link can't be repaired: {error}")
+                return
+            self._report(f"identity link was repaired: '{self._link}' -> '{replacement}' ({self._active})")
+            self._flag_link(None)
+            return
+
+        self._flag_link(f"identity link is dangling: '{self._link}' -> '{target}'")
+
+    def _account_of(self, target: Path) -> str | None:
+        """Find the account of the link target, the registered cert file may go through symlinks the target doesn't."""
+        records = (self._records or {}).items()
+        absolute = target.absolute()
+        for name, record in records:
+            if self._cert_path(record) == absolute:
+                return name
+
+        resolved = target.resolve()
+        return next((name for name, record in records if self._cert_path(record).resolve() == resolved), None)
+
+    def _flag_link(self, problem: str | None) -> None:
+        if problem is not None and problem != self._link_problem:
+            self._report(problem)
+        self._link_problem = problem
+
+    def _reload_ssh_config(self) -> None:
+        if not self._ssh_config_path.is_file():
+            self._update_ssh_problems({None: [f"ssh config ({self._ssh_config_path}) is missing"]}, {})
+            return
+
+        try:
+            config = SshConfig.from_path(self._ssh_config_path, self._fragments)
+        except SshConfigError as error:
+            self._update_ssh_problems({None: [f"ssh config is corrupted: {error.message}"]}, {})
+            return
+
+        self._ssh_sources = config.sources
+        blocks: dict[BlockKey, HostInfo] = {}
+        for block in config.blocks:
+            occurrence = sum(1 for key in blocks if key[:2] == (block.host, block.match))
+            blocks[(block.host, block.match, occurrence)] = block.params
+
+        problems: dict[BlockKey | None, list[str]] = {
+            key: self._check_block(key, params) for key, params in blocks.items() if self._blocks.get(key) != params
+        }
+        identity = config.resolve("github.com").get(SshKeyword.IdentityFile)
+        if identity is None or Path(identity.strip('"')).expanduser().absolute() != self._link:
+            problems[None] = [f"ssh config doesn't point github.com to the identity link ({self._link})"]
+        else:
+            problems[None] = []
+        self._update_ssh_problems(problems, blocks)
+
+    def _update_ssh_problems(
+        self, problems: dict[BlockKey | None, list[str]], blocks: dict[BlockKey, HostInfo]
+    ) -> None:
+        """Report problems of the validated blocks that weren't there before, blocks not passed keep theirs."""
+        for removed in self._blocks.keys() - blocks.keys():
+            self._ssh_problems.pop(removed, None)
+        self._blocks = blocks
+
+        for key, found in problems.items():
+            known = self._ssh_problems.get(key, [])
+            for problem in found:
+                if problem not in known:
+                    self._report(problem)
+            if known and not found and key is not None:
+                self._report(f"ssh host ({key[0]}) is valid")
+            self._ssh_problems[key] = found
+
+    def _check_block(self, key: BlockKey, params: HostInfo) -> list[str]:
+        host = key[0]
+        if not host:
+            return ["ssh config has a Host without patterns"]
+
+        identity = params.get(SshKeyword.IdentityFile)
+        if identity is None or "%" in identity:  # tokens are expanded by ssh for the connection
+            return []
+
+        path = Path(identity.strip('"')).expanduser()
+        if not path.is_absolute() or path.exists() or path == self._link:  # the link is checked on its own
+            return []
+        return [f"ssh host ({host}): IdentityFile '{identity}' is missing"]
+
+    @staticmethod
+    def _cert_path(record: AccountRecord) -> Path:
+        return Path(record[1]).expanduser().absolute()
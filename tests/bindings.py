@@ -0,0 +1,81 @@
+from os import readlink
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import main
+from unittest import TestCase
+
+from github_tools.internal.account import Account
+from github_tools.internal.bindings import Bindings
+from github_tools.internal.registry_file import RegistryFile
+
+
+class BindingsTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = TemporaryDirectory()
+        self.root = Path(self._temp_dir.name).resolve()
+        self.storage = RegistryFile(self.root / "registry.cfg")
+        for name in ("personal", "work", "client"):
+            (self.root / name).touch()
+            self.storage.add(Account.create(name, self.root / name))
+
+        self.bindings = Bindings(self.storage)
+        self.bindings.bind(self.root / "home", "personal")
+        self.bindings.bind(self.root / "home" / "work", "work")
+        self.bindings.bind(self.root / "home" / "work" / "client", "client")
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def lookup(self, *parts: str) -> str | None:
+        binding = self.bindings.lookup(self.root.joinpath(*parts))
+        return binding and binding[0]
+
+    def test_lookup(self) -> None:
+        self.assertIsNone(self.lookup())
+        self.assertIsNone(self.lookup("elsewhere"))
+        self.assertEqual("personal", self.lookup("home"))
+        self.assertEqual("personal", self.lookup("home", "projects", "tool"))
+        self.assertEqual("work", self.lookup("home", "work", "repo"))
+        self.assertEqual("client", self.lookup("home", "work", "client", "repo", "src"))
+        self.assertEqual("personal", self.lookup("home", "workshop"))
+
+    def test_rules_changes(self) -> None:
+        self.assertTrue(self.bindings.unbind(self.root / "home" / "work"))
+        self.assertFalse(self.bindings.unbind(self.root / "home" / "work"))
+        self.assertEqual("personal", self.lookup("home", "work", "repo"))
+
+        self.bindings.bind(self.root / "home" / "work", "client")
+        self.assertEqual("client", Bindings(self.storage).lookup(self.root / "home" / "work")[0])  # type: ignore[index]
+
+    def test_registry_changes(self) -> None:
+        self.assertEqual(str(self.root / "work"), self.bindings.lookup(self.root / "home" / "work")[1])  # type: ignore
+
+        (self.root / "moved").touch()
+        self.storage.add(Account.create("work", self.root / "moved"))
+        self.assertEqual(str(self.root / "moved"), self.bindings.lookup(self.root / "home" / "work")[1])  # type: ignore
+
+        self.storage.remove("work")
+        self.assertEqual(("work", ""), self.bindings.lookup(self.root / "home" / "work"))
+
+    def test_lookup_normalizes(self) -> None:
+        (self.root / "home" / "work" / "repo").mkdir(parents=True)
+        (self.root / "checkout").symlink_to(self.root / "home" / "work" / "repo")
+        self.assertEqual("work", self.lookup("checkout"))
+        self.assertEqual("client", self.lookup("checkout", "..", "client"))
+        self.assertEqual("personal", self.lookup("home", "work", ".."))
+
+    def test_apply(self) -> None:
+        link = self.root / "identity"
+        self.assertIsNone(self.bindings.apply(link, self.root / "elsewhere"))
+        self.assertFalse(link.is_symlink())
+
+        self.assertEqual("work", self.bindings.apply(link, self.root / "home" / "work"))
+        self.assertEqual(str(self.root / "work"), readlink(link))
+        self.assertIsNone(self.bindings.apply(link, self.root / "home" / "work" / "repo"))
+
+        self.assertEqual("personal", self.bindings.apply(link, self.root / "home"))
+        self.assertEqual(str(self.root / "personal"), readlink(link))
+
+
+if __name__ == "__main__":
+    main()
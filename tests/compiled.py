@@ -0,0 +1,47 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import main
+from unittest import TestCase
+
+from github_tools.internal.compiled import CompiledRegistry
+from github_tools.internal.compiled import write_compiled
+
+KEY = (1, 2, 3)
+
+
+class CompiledRegistryTestCase(TestCase):
+    def test_search(self) -> None:
+        records = [(f"user-{index}", f"/keys/{index % 7}", "", f"User{index % 5}@example.com") for index in range(1000)]
+        records.append(("Jürgen", "/keys/ключ", "Jürgen", "jürgen@example.com"))
+
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "registry.compiled"
+            write_compiled(path, KEY, 42, reversed(records))
+
+            image = CompiledRegistry.open(path)
+            assert image is not None
+            with image:
+                self.assertEqual((KEY, 42, 1001), (image.key, image.generation, len(image)))
+                self.assertEqual(records[500], image.get("user-500"))
+                self.assertEqual(records[-1], image.get("Jürgen"))
+                self.assertIsNone(image.get("user-1000"))
+                self.assertEqual([records[-1]], image.find_cert_file("/keys/ключ"))
+                self.assertEqual(143, len(image.find_cert_file("/keys/3")))
+                self.assertEqual(200, len(image.find_email("user1@EXAMPLE.com")))
+                self.assertEqual([], image.find_email("user5@example.com"))
+
+    def test_malformed(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "registry.compiled"
+            self.assertIsNone(CompiledRegistry.open(path))
+
+            path.touch()
+            self.assertIsNone(CompiledRegistry.open(path))
+
+            write_compiled(path, KEY, 1, [("Joe", "/keys/joe", "", "")])
+            path.write_bytes(path.read_bytes()[:60])
+            self.assertIsNone(CompiledRegistry.open(path))
+
+
+if __name__ == "__main__":
+    main()
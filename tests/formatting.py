@@ -0,0 +1,55 @@
+from io import StringIO
+from json import loads
+from unittest import main
+from unittest import TestCase
+
+from github_tools.internal.formatting import BUFFER_SIZE
+from github_tools.internal.formatting import Record
+from github_tools.internal.formatting import write_records
+
+RECORDS: list[Record] = [
+    ("work", "/keys/work", "Me", "me@work.com", "ED25519 SHA256:abc"),
+    ("home", "/keys/with\ttab", "", "", ""),
+]
+
+
+class CountingStream(StringIO):
+    writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super().write(text)
+
+
+class FormattingTestCase(TestCase):
+    def render(self, fields: tuple[str, ...], output_format: str, records: list[Record] = RECORDS) -> str:
+        stream = StringIO()
+        write_records(stream, iter(records), fields, output_format)
+        return stream.getvalue()
+
+    def test_formats(self) -> None:
+        fields = ("name", "email")
+        self.assertEqual(
+            [{"name": "work", "email": "me@work.com"}, {"name": "home", "email": ""}],
+            loads(self.render(fields, "json")),
+        )
+        self.assertEqual([], loads(self.render(fields, "json", [])))
+        self.assertEqual({"name": "work", "email": "me@work.com"}, loads(self.render(fields, "jsonl").splitlines()[0]))
+        self.assertEqual(
+            "name\tcert_file\nwork\t/keys/work\nhome\t/keys/with\\ttab\n", self.render(("name", "cert_file"), "tsv")
+        )
+
+        text = self.render(("name",), "text")
+        self.assertTrue(text.startswith("Github Accounts:\nwork:\n    cert:   '/keys/work'\n    key:    ED25519"))
+        self.assertIn("    key:    unknown\n    author: ''\n", text)
+        self.assertEqual("no accounts\n", self.render(("name",), "text", []))
+
+    def test_buffering(self) -> None:
+        stream = CountingStream()
+        records = (("account", "/keys/account", "", "", "") for _ in range(100_000))
+        self.assertEqual(100_000, write_records(stream, records, ("name", "cert_file"), "tsv"))
+        self.assertLess(stream.writes, len(stream.getvalue()) // BUFFER_SIZE + 2)
+
+
+if __name__ == "__main__":
+    main()
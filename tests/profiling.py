@@ -0,0 +1,43 @@
+from json import loads
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from unittest import main
+from unittest import TestCase
+
+from github_tools.internal import profiling
+from github_tools.internal.profiling import Profiler
+
+
+class ProfilingTestCase(TestCase):
+    def test_disabled(self) -> None:
+        self.assertFalse(profiling.enabled())
+        self.assertIs(profiling.phase("first"), profiling.phase("second"))
+        profiling.count("ignored")
+
+    def test_report(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            output = Path(temp_dir) / "profile.json"
+            profiler = Profiler(str(output), perf_counter())
+            for _ in range(3):
+                with profiler.phase("load"):
+                    with profiler.phase("parse"):
+                        profiler.count("accounts parsed", 10)
+            with profiler.phase("save"):
+                profiler.count("files stat'ed")
+            profiler.record("imports", 0.5)
+            profiler.write()
+
+            report = loads(output.read_text(encoding="utf-8"))
+
+        self.assertEqual("total", report["name"])
+        self.assertEqual(["load", "save", "imports"], [phase["name"] for phase in report["phases"]])
+        load = report["phases"][0]
+        self.assertEqual(3, load["calls"])
+        self.assertEqual([("parse", 3)], [(phase["name"], phase["calls"]) for phase in load["phases"]])
+        self.assertEqual(500.0, report["phases"][2]["ms"])
+        self.assertEqual({"accounts parsed": 30, "files stat'ed": 1}, report["counters"])
+
+
+if __name__ == "__main__":
+    main()
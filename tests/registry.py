@@ -1,9 +1,15 @@
 from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import main
 from unittest import TestCase
+from unittest.mock import Mock
+from unittest.mock import patch
 
 from github_tools.internal.account import Account
+from github_tools.internal.account import AccountRecord
 from github_tools.internal.registry import ErrorCode
+from github_tools.internal.registry import MIGRATIONS
 from github_tools.internal.registry import Registry
 from github_tools.internal.registry import RegistryError
 
@@ -43,6 +49,54 @@ class RegistryTestCase(TestCase):
             Registry.load(StringIO("[Joe]\ncert_file="))
         self.assertEqual(ErrorCode.FieldValueMissed, call_context.exception.code)
 
+    def test_load_lazy(self) -> None:
+        source = "# comment\n[Jack]\ncert_file = /fake/jack\n[Joe]\nauthor = Joe\n[Jane]\ncert_file = /fake/jane\n"
+        on_parsed = Mock()
+        registry = Registry.load(StringIO(source), lazy=True, on_parsed=on_parsed)
+        self.assertEqual(3, len(registry))
+        self.assertTrue("Joe" in registry)
+        self.assertEqual(Account.create("Jane", "/fake/jane"), registry.get("Jane"))
+
+        with self.assertRaises(RegistryError) as call_context:
+            registry.get("Joe")
+        self.assertEqual(ErrorCode.FieldMissed, call_context.exception.code)
+        with self.assertRaises(RegistryError):
+            list(registry.records())
+
+        # the malformed section is never parsed once it's replaced
+        registry.add(Account.create("Joe", "/fake/joe"), rewrite=True)
+        self.assertEqual(["Jack", "Joe", "Jane"], [name for name, *_ in registry.records()])
+        on_parsed.assert_not_called()
+
+        registry = Registry.load(StringIO(source.replace("author", "cert_file")), lazy=True, on_parsed=on_parsed)
+        self.assertEqual(3, len(registry.accounts))
+        on_parsed.assert_called_once_with(list(registry.records()))
+
+        with self.assertRaises(RegistryError) as call_context:
+            Registry.load(StringIO("[Joe]\n[Joe]\n"), lazy=True)
+        self.assertEqual(ErrorCode.DuplicateAccount, call_context.exception.code)
+
+        with self.assertRaises(RegistryError) as call_context:
+            Registry.load(StringIO("Joe\n[Joe]\n"), lazy=True)
+        self.assertEqual(ErrorCode.FileCorrupted, call_context.exception.code)
+
+    def test_schema(self) -> None:
+        def upgrade(record: AccountRecord) -> AccountRecord:
+            name, cert_file, author, email = record
+            return name, cert_file, author or name, email
+
+        with patch("github_tools.internal.registry.SCHEMA_VERSION", 2), patch.dict(MIGRATIONS, {1: upgrade}):
+            for lazy in (False, True):
+                registry = Registry.load(load_fake_db(), schema=1, lazy=lazy)
+                self.assertEqual(["Jack", "Joe"], [account.author for account in registry])
+
+                registry = Registry.load(load_fake_db(), schema=2, lazy=lazy)
+                self.assertEqual(["", ""], [account.author for account in registry])
+
+        with self.assertRaises(RegistryError) as call_context:
+            Registry.load(load_fake_db(), schema=2)
+        self.assertEqual(ErrorCode.UnsupportedSchema, call_context.exception.code)
+
     def test_modify_operations(self) -> None:
         registry = Registry()
 
@@ -58,9 +112,53 @@ class RegistryTestCase(TestCase):
         self.assertEqual(1, len(registry))
         self.assertTrue("Joe" in registry)
 
+        self.assertEqual(["Joe"], [account.name for account in registry])
+
         registry.remove("Joe")
         self.assertEqual(0, len(registry))
 
+    def test_find_cert_file(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir).resolve()
+            (root / "real").mkdir()
+            (root / "real" / "key").touch()
+            (root / "keys").symlink_to(root / "real")
+
+            registry = Registry()
+            for index in range(100):
+                registry.add(Account.create(f"user-{index}", root / "keys" / f"key-{index}"))
+            registry.add(Account.create("linked", root / "keys" / "key"))
+
+            with patch.object(Path, "resolve", autospec=True, side_effect=Path.resolve) as resolve:
+                self.assertEqual(
+                    ["user-7"], [account.name for account in registry.find(cert_file=root / "keys" / "key-7")]
+                )
+                self.assertEqual(0, resolve.call_count)
+
+                self.assertEqual(
+                    ["linked"], [account.name for account in registry.find(cert_file=root / "real" / "key")]
+                )
+                self.assertGreater(resolve.call_count, 100)  # the resolved index is built once the lookup misses
+
+    def test_find(self) -> None:
+        registry = Registry()
+        registry.add(Account.create("Jack", "/fake/jack", "Jack", "jack@example.com"))
+        registry.add(Account.create("Joe", "/fake/joe", "Joe", "Shared@Example.com"))
+        self.assertEqual(["Jack"], [account.name for account in registry.find(email="JACK@example.com")])
+        self.assertEqual(["Joe"], [account.name for account in registry.find(cert_file="/fake/../fake/joe")])
+
+        # indexes are already built, so further changes are applied to them
+        registry.add(Account.create("Jim", "/fake/jim", "Jim", "shared@example.com"))
+        names = [account.name for account in registry.find(email="shared@example.com")]
+        self.assertEqual(["Joe", "Jim"], names)
+        self.assertEqual(["Jim"], [account.name for account in registry.find(email="shared@example.com", author="Jim")])
+
+        registry.add(Account.create("Joe", "/fake/joe", "Joe", "joe@example.com"), rewrite=True)
+        registry.remove("Jim")
+        self.assertEqual([], registry.find(email="shared@example.com"))
+        self.assertEqual(["Joe"], [account.name for account in registry.find(email="joe@example.com", author="Joe")])
+        self.assertEqual([], registry.find(email="joe@example.com", author="Jack"))
+
     def test_save(self) -> None:
         registry = Registry.load(load_fake_db())
         registry.remove("Joe")
@@ -76,6 +174,37 @@ class RegistryTestCase(TestCase):
         self.assertFalse("author" in content)
         self.assertFalse("email" in content)
 
+    def test_save_round_trip(self) -> None:
+        registry = Registry()
+        registry.add(Account.create("Joe", "/keys/joe", "Joe Doe", "joe@example.com"))
+        registry.add(Account.create("Jack", "/keys/50%", "multi\nline", "jack"))
+        registry.add(Account.create("Jane", "jane", email="jane@example.com"))
+        registry.add(Account.create("Joe", "/keys/other", "Joe", "JOE@example.com"), rewrite=True)
+
+        fake_file = StringIO()
+        registry.save(fake_file)
+        fake_file.seek(0)
+
+        loaded = Registry.load(fake_file)
+        self.assertEqual(list(loaded.records()), list(registry.records()))
+        self.assertEqual(loaded.accounts, registry.accounts)
+        self.assertEqual(registry.get("Joe"), Account.create("Joe", "/keys/other", "Joe", "JOE@example.com"))
+        self.assertEqual([account.name for account in registry], ["Joe", "Jack", "Jane"])
+
+    def test_remove_many(self) -> None:
+        registry = Registry.from_records((f"user-{index}", f"/keys/{index}", "", "") for index in range(5000))
+        for index in range(0, 5000, 3):
+            registry.add(Account.create(f"user-{index}", f"/keys/new-{index}"), rewrite=True)
+        for index in range(4000):
+            if index % 3:
+                self.assertTrue(registry.remove(f"user-{index}"))
+
+        self.assertEqual(len(registry), 1334 + 1000)
+        self.assertEqual(registry.get("user-3"), Account.create("user-3", "/keys/new-3"))
+        self.assertEqual(registry.get("user-4999"), Account.create("user-4999", "/keys/4999"))
+        self.assertIsNone(registry.get("user-4"))
+        self.assertEqual([account.name for account in registry.find(cert_file="/keys/new-6")], ["user-6"])
+
 
 if __name__ == "__main__":
     main()
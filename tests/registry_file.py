@@ -0,0 +1,258 @@
+from multiprocessing import Process
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import main
+from unittest import TestCase
+from unittest.mock import patch
+
+from github_tools.internal.account import Account
+from github_tools.internal.registry import ErrorCode
+from github_tools.internal.registry import Registry
+from github_tools.internal.registry import RegistryError
+from github_tools.internal.registry_file import HEADER_PREFIX
+from github_tools.internal.registry_file import RegistryFile
+
+
+STRESS_WORKERS = 4
+STRESS_MUTATIONS = 100
+
+
+def stress_worker(path: Path, worker: int) -> None:
+    storage = RegistryFile(path, journal_limit=4096)
+    for index in range(STRESS_MUTATIONS):
+        account = Account.create(f"worker-{worker}-{index}", f"/fake/cert-{worker}-{index}")
+        if index % 10:
+            storage.add(account)
+        else:
+            storage.update(lambda registry: registry.add(account))
+
+
+def make_registry() -> Registry:
+    registry = Registry()
+    registry.add(Account.create("Jack", "/fake/cert-file", author="Jack", email="jack@example.com"))
+    registry.add(Account.create("Joe", "other/fake-file"))
+    return registry
+
+
+class RegistryFileTestCase(TestCase):
+    def test_missing_file(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            self.assertEqual(0, len(storage.load()))
+
+    def test_round_trip(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.save(make_registry())
+            self.assertTrue(storage.snapshot.is_file())
+
+            registry = storage.load()
+            self.assertEqual(list(make_registry().records()), list(registry.records()))
+
+    def test_snapshot_skips_parser(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.save(make_registry())
+
+            with patch.object(Registry, "_read_storage", side_effect=AssertionError("ini parsed")):
+                registry = storage.load()
+            self.assertEqual(2, len(registry))
+            self.assertEqual(Path("/fake/cert-file"), registry.get("Jack").cert_file)  # type: ignore[union-attr]
+
+    def test_stale_snapshot(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.save(make_registry())
+
+            with open(storage.path, "a", encoding="utf-8") as file:
+                file.write("[Jane]\ncert_file = /fake/jane\n")
+
+            registry = storage.load()
+            self.assertEqual(3, len(registry))
+            self.assertTrue("Jane" in registry)
+
+    def test_journal(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.save(make_registry())
+            base = storage.path.read_bytes()
+
+            storage.add(Account.create("Jane", "/fake/jane", email="jane@example.com"))
+            storage.remove("Joe")
+            self.assertEqual(base, storage.path.read_bytes())
+            self.assertTrue(storage.journal.is_file())
+
+            registry = storage.load()
+            self.assertEqual({"Jack", "Jane"}, {account.name for account in registry.accounts})
+            self.assertEqual("jane@example.com", registry.get("Jane").email)  # type: ignore[union-attr]
+
+    def test_journal_torn_record(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.add(Account.create("Jane", "/fake/jane"))
+            with open(storage.journal, "a", encoding="utf-8") as file:
+                file.write('["+", "Jo')
+
+            self.assertEqual(1, len(storage.load()))
+
+    def test_journal_corrupted(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.journal.write_text('["@", 0]\n["?"]\n', encoding="utf-8")
+
+            with self.assertRaises(RegistryError) as call_context:
+                storage.load()
+            self.assertEqual(ErrorCode.FileCorrupted, call_context.exception.code)
+
+    def test_journal_compaction(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg", journal_limit=256)
+            for index in range(20):
+                storage.add(Account.create(f"user-{index}", f"/fake/cert-{index}"))
+
+            self.assertTrue(storage.path.is_file())
+            self.assertLessEqual(storage.journal.stat().st_size if storage.journal.exists() else 0, 256)
+            self.assertEqual(20, len(storage.load()))
+
+    def test_stale_save(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "registry.cfg"
+            RegistryFile(path).save(make_registry())
+
+            first = RegistryFile(path)
+            second = RegistryFile(path)
+            first_registry = first.load()
+            second_registry = second.load()
+
+            second_registry.remove("Joe")
+            second.save(second_registry)
+
+            first_registry.remove("Jack")
+            with self.assertRaises(RegistryError) as call_context:
+                first.save(first_registry)
+            self.assertEqual(ErrorCode.StaleRegistry, call_context.exception.code)
+
+            first.update(lambda registry: registry.remove("Jack"))
+            self.assertEqual(0, len(RegistryFile(path).load()))
+
+    def test_stale_after_journal_append(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "registry.cfg"
+            first = RegistryFile(path)
+            registry = first.load()
+
+            RegistryFile(path).add(Account.create("Jane", "/fake/jane"))
+            with self.assertRaises(RegistryError):
+                first.save(registry)
+
+            # own appends keep the loaded state current
+            registry = first.load()
+            first.add(Account.create("Joe", "/fake/joe"))
+            registry.add(Account.create("Joe", "/fake/joe"))
+            first.save(registry)
+            self.assertEqual({"Jane", "Joe"}, {account.name for account in first.load().accounts})
+
+    def test_folded_journal_is_ignored(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.add(Account.create("Jane", "/fake/jane"))
+            journal = storage.journal.read_bytes()
+
+            registry = storage.load()
+            registry.remove("Jane")
+            storage.save(registry)
+
+            # emulate a crash between the ini file replacement and the journal removal
+            storage.journal.write_bytes(journal)
+            self.assertEqual(0, len(storage.load()))
+
+    def test_no_leftovers(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.save(make_registry())
+            storage.save(make_registry(), force=True)
+
+            self.assertEqual(
+                {storage.path.name, storage.snapshot.name, storage.lock.path.name},
+                {path.name for path in Path(temp_dir).iterdir()},
+            )
+
+    def test_concurrent_writers(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "registry.cfg"
+            workers = [Process(target=stress_worker, args=(path, worker)) for worker in range(STRESS_WORKERS)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+            self.assertTrue(all(worker.exitcode == 0 for worker in workers))
+            self.assertEqual(STRESS_WORKERS * STRESS_MUTATIONS, len(RegistryFile(path).load()))
+
+    def test_lazy_load(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.path.write_text("[Jack]\ncert_file = /fake/jack\n[Joe]\n", encoding="utf-8")
+
+            registry = storage.load()
+            self.assertEqual(Account.create("Jack", "/fake/jack"), registry.get("Jack"))
+            self.assertFalse(storage.snapshot.exists())
+
+            storage.add(Account.create("Joe", "/fake/joe"))
+            self.assertEqual(2, len(storage.load().accounts))
+            storage.compact()
+            self.assertTrue(storage.path.read_text(encoding="utf-8").startswith(f"{HEADER_PREFIX}1 schema=1\n"))
+
+            storage.snapshot.unlink()
+            self.assertEqual(2, len(storage.load().accounts))
+            self.assertTrue(storage.snapshot.exists())
+
+            storage.path.write_text(f"{HEADER_PREFIX}5 schema=99\n", encoding="utf-8")
+            with self.assertRaises(RegistryError) as call_context:
+                storage.load()
+            self.assertEqual(ErrorCode.UnsupportedSchema, call_context.exception.code)
+
+    def test_lookup(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.save(make_registry())
+            self.assertIsNone(storage.lookup(name="Jack"))
+
+            storage.compile()
+            self.assertTrue(storage.compiled.is_file())
+            self.assertEqual(
+                [Account.create("Jack", "/fake/cert-file", "Jack", "jack@example.com")], storage.lookup(name="Jack")
+            )
+            self.assertEqual(["Jack"], [account.name for account in storage.lookup(email="JACK@example.com") or []])
+            self.assertEqual(["Joe"], [account.name for account in storage.lookup(cert_file="other/fake-file") or []])
+            self.assertEqual([], storage.lookup(name="Jane"))
+            self.assertEqual([], storage.lookup(name="Jack", email="joe@example.com"))
+            self.assertIsNone(storage.lookup(cert_file="/fake/missing"))
+
+            # journaled changes override the image
+            storage.remove("Jack")
+            storage.add(Account.create("Jane", "/fake/jane", email="jack@example.com"))
+            self.assertEqual([], storage.lookup(name="Jack"))
+            self.assertEqual(["Jane"], [account.name for account in storage.lookup(email="jack@example.com") or []])
+
+            # the image follows full saves and is ignored once the ini file is changed by others
+            storage.compact()
+            self.assertEqual(["Jane"], [account.name for account in storage.lookup(cert_file="/fake/jane") or []])
+            storage.path.write_text("[Jim]\ncert_file = /fake/jim\n", encoding="utf-8")
+            self.assertIsNone(storage.lookup(name="Jim"))
+
+            storage.uncompile()
+            storage.save(storage.load(), force=True)
+            self.assertFalse(storage.compiled.exists())
+
+    def test_drop(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            storage = RegistryFile(Path(temp_dir) / "registry.cfg")
+            storage.save(make_registry())
+            storage.drop()
+            self.assertFalse(storage.path.exists())
+            self.assertFalse(storage.snapshot.exists())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import main
+from unittest import TestCase
+
+from github_tools.internal.ssh_audit import audit_file
+from github_tools.internal.ssh_audit import audit_files
+from github_tools.internal.ssh_audit import AuditResult
+
+
+class AuditTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = TemporaryDirectory()
+        self.root = Path(self._temp_dir.name)
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def write(self, name: str, content: str) -> str:
+        path = self.root / name
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    def test_audit_file(self) -> None:
+        path = self.write("config", "Host github.com\n    IdentityFile ~/.ssh/work\n")
+        self.assertEqual(AuditResult(path, valid=True, github=True, identity_files=["~/.ssh/work"]), audit_file(path))
+
+        path = self.write("other", "Host gitlab.com\n    User git\n")
+        self.assertEqual(AuditResult(path, valid=True), audit_file(path))
+
+        path = self.write("invalid", "Host \n    User git\n")
+        self.assertEqual(AuditResult(path, valid=False, error="Host without patterns"), audit_file(path))
+
+        missing = str(self.root / "missing")
+        self.assertEqual(AuditResult(missing, False, f"ssh config ({missing}) can't be read"), audit_file(missing))
+
+    def test_conflicts(self) -> None:
+        self.write("github", "Host github.com\n    IdentityFile ~/.ssh/personal\n")
+        path = self.write(
+            "config",
+            "Host github.com\n    IdentityFile ~/.ssh/work\n"
+            "Include github\n"
+            "Host *\n    IdentityFile ~/.ssh/work\n",
+        )
+        result = audit_file(path)
+        self.assertEqual(["~/.ssh/work", "~/.ssh/personal", "~/.ssh/work"], result.identity_files)
+        self.assertTrue(result.conflicting)
+        self.assertTrue(result.to_json()["conflicting"])
+
+        result = audit_file(self.write("config", "Host github.com\n    IdentityFile ~/.ssh/work\nHost *\n"))
+        self.assertFalse(result.conflicting)
+
+        result = audit_file(
+            self.write("config", "Host github.com\n    IdentityFile ~/.ssh/a\n    IdentityFile ~/.ssh/b\n")
+        )
+        self.assertEqual(["~/.ssh/a", "~/.ssh/b"], result.identity_files)
+        self.assertTrue(result.conflicting)
+
+    def test_audit_files(self) -> None:
+        configs = [
+            self.write(f"config-{index}", f"Host github.com\n    IdentityFile ~/.ssh/{index}\n") for index in range(40)
+        ]
+        configs.insert(20, self.write("invalid", "Host \n"))
+
+        sequential = list(audit_files(configs, workers=1))
+        self.assertEqual(configs, [result.path for result in sequential])
+        self.assertEqual(sequential, list(audit_files(configs, workers=3)))
+        self.assertEqual([configs[20]], [result.path for result in sequential if not result.valid])
+
+
+if __name__ == "__main__":
+    main()
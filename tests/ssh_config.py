@@ -1,7 +1,11 @@
 from io import StringIO
+from os import utime
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import main
 from unittest import TestCase
 
+from github_tools.internal.ssh_config import FragmentCache
 from github_tools.internal.ssh_config import SshConfig
 from github_tools.internal.ssh_config import SshConfigError
 from github_tools.internal.ssh_config import SshKeyword
@@ -33,7 +37,30 @@ class SshConfigTestCase(TestCase):
         self.assertTrue("google.com" not in config)
 
         with self.assertRaises(SshConfigError):
-            SshConfig(StringIO("Host gitlab.com\nInvalidKey publickey"))
+            SshConfig(StringIO("Host gitlab.com\n=publickey"))
+
+    def test_syntax(self) -> None:
+        config = SshConfig(
+            StringIO(
+                "user global\n"
+                "HOST github.com\n"
+                "    hostname=github.com\n"
+                '    IdentityFile = "~/.ssh/my key"\n'
+                "    Port\t22\n"
+                "    UnknownKeyword some value\n"
+            )
+        )
+        self.assertEqual({"*", "github.com"}, set(config.hosts))
+        self.assertEqual({SshKeyword.User: "global"}, config.get("*"))
+        self.assertEqual(
+            {
+                SshKeyword.HostName: "github.com",
+                SshKeyword.IdentityFile: "~/.ssh/my key",
+                SshKeyword.Port: "22",
+                "UnknownKeyword": "some value",
+            },
+            config.get("github.com"),
+        )
 
     def test_host_config(self) -> None:
         config = SshConfig(StringIO(DUMMY_SSH_CONFIG))
@@ -57,6 +84,128 @@ class SshConfigTestCase(TestCase):
         google_config = config.get("google.com")
         self.assertTrue(google_config is None)
 
+    def test_repeated_keyword(self) -> None:
+        config = SshConfig(StringIO("Host x\n    User first\n    User second\n    Port 22\nHost *\n    User default\n"))
+        self.assertEqual({SshKeyword.User: "first", SshKeyword.Port: "22"}, config.get("x"))
+        self.assertEqual(
+            {SshKeyword.HostName: "x", SshKeyword.User: "first", SshKeyword.Port: "22"}, config.resolve("x")
+        )
+
+    def test_resolve(self) -> None:
+        config = SshConfig(
+            StringIO(
+                "Host github.com gitlab.com\n"
+                "    User git\n"
+                "Host *.corp.example.com !secret.corp.example.com\n"
+                "    User corp\n"
+                "    Port 2222\n"
+                "Host build-?? \n"
+                "    HostName %h.ci.example.com\n"
+                "Match host *.example.com\n"
+                "    IdentityFile ~/.ssh/example\n"
+                "Match exec true\n"
+                "    User never\n"
+                "Host *\n"
+                "    User default\n"
+                "    Port 22\n"
+            )
+        )
+
+        self.assertEqual(
+            {SshKeyword.HostName: "github.com", SshKeyword.User: "git", SshKeyword.Port: "22"},
+            config.resolve("GitHub.com"),
+        )
+        self.assertEqual(
+            {
+                SshKeyword.HostName: "db.corp.example.com",
+                SshKeyword.User: "corp",
+                SshKeyword.Port: "2222",
+                SshKeyword.IdentityFile: "~/.ssh/example",
+            },
+            config.resolve("db.corp.example.com"),
+        )
+        self.assertEqual("default", config.resolve("secret.corp.example.com")[SshKeyword.User])
+        self.assertEqual("build-01.ci.example.com", config.resolve("build-01")[SshKeyword.HostName])
+        self.assertEqual("build-001", config.resolve("build-001")[SshKeyword.HostName])
+        self.assertEqual(
+            {SshKeyword.HostName: "other", SshKeyword.User: "default", SshKeyword.Port: "22"}, config.resolve("other")
+        )
+
+        # Match blocks don't register hosts
+        self.assertEqual(
+            {"github.com gitlab.com", "*.corp.example.com !secret.corp.example.com", "build-??", "*"}, set(config.hosts)
+        )
+
+    def test_include(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "config.d").mkdir()
+            (root / "config").write_text("Include config.d/*\nHost *\n    User default\n", encoding="utf-8")
+            (root / "config.d" / "10-github").write_text(DUMMY_SSH_CONFIG, encoding="utf-8")
+            (root / "config.d" / "20-corp").write_text(
+                "Host *.corp\n    User corp\n    Include nested\n", encoding="utf-8"
+            )
+            (root / "nested").write_text("Port 2222\n", encoding="utf-8")
+
+            cache = FragmentCache()
+            config = SshConfig.from_path(root / "config", cache)
+            self.assertEqual({"gitlab.com", "github.com", "*.corp", "*"}, set(config.hosts))
+            self.assertEqual({SshKeyword.User: "corp", SshKeyword.Port: "2222"}, config.get("*.corp"))
+            self.assertEqual(4, cache.misses)
+            self.assertFalse(config.is_stale())
+
+            (root / "nested").write_text("Port 2200\n", encoding="utf-8")
+            utime(root / "nested", ns=(0, 0))
+            self.assertTrue(config.is_stale())
+
+            config = SshConfig.from_path(root / "config", cache)
+            self.assertEqual("2200", config.resolve("db.corp")[SshKeyword.Port])
+            self.assertEqual(5, cache.misses)
+
+            (root / "config.d" / "30-new").write_text("Host new\n", encoding="utf-8")
+            utime(root / "config.d", ns=(0, 0))
+            self.assertTrue(config.is_stale())
+            self.assertTrue("new" in SshConfig.from_path(root / "config", cache))
+
+    def test_include_in_block(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "config").write_text(
+                "Include top\nUser after\nHost a\n    Include block\n    User outer\nHost c\n    Include any\n",
+                encoding="utf-8",
+            )
+            (root / "top").write_text("Host d\n    Port 4\n", encoding="utf-8")
+            (root / "block").write_text("Host b\n    Port 1\nHost *\n    Port 7\n", encoding="utf-8")
+            (root / "any").write_text("Host *\n    Port 3\n", encoding="utf-8")
+
+            # the same as **ssh -G** gives: blocks of an included file apply only along with the enclosing block
+            config = SshConfig.from_path(root / "config")
+            self.assertEqual(
+                {SshKeyword.HostName: "a", SshKeyword.User: "after", SshKeyword.Port: "7"}, config.resolve("a")
+            )
+            self.assertEqual({SshKeyword.HostName: "b", SshKeyword.User: "after"}, config.resolve("b"))
+            self.assertEqual(
+                {SshKeyword.HostName: "c", SshKeyword.User: "after", SshKeyword.Port: "3"}, config.resolve("c")
+            )
+            self.assertEqual(
+                {SshKeyword.HostName: "d", SshKeyword.User: "after", SshKeyword.Port: "4"}, config.resolve("d")
+            )
+
+            (root / "config").write_text("Host a\n    Include top\n    User outer\n", encoding="utf-8")
+            config = SshConfig.from_path(root / "config")
+            self.assertEqual({SshKeyword.HostName: "a", SshKeyword.User: "outer"}, config.resolve("a"))
+            self.assertEqual({SshKeyword.HostName: "d"}, config.resolve("d"))
+
+    def test_include_cycle(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "config").write_text("Include other\n", encoding="utf-8")
+            (root / "other").write_text("Host other\n    Include config\n", encoding="utf-8")
+
+            with self.assertRaises(SshConfigError):
+                SshConfig.from_path(root / "config")
+            self.assertFalse(SshConfig.verify_file(root / "config"))
+
 
 if __name__ == "__main__":
     main()
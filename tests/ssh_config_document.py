@@ -0,0 +1,93 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import main
+from unittest import TestCase
+
+from github_tools.internal.ssh_config import SshKeyword
+from github_tools.internal.ssh_config_document import SshConfigDocument
+
+DUMMY_SSH_CONFIG = b"""# managed by config management
+Host gitlab.com
+  # keep the key
+  IdentityFile ~/.ssh/gitlab
+
+Host github.com
+\tHostName github.com
+\tIdentityFile=~/.ssh/old\t
+\tUnknownKeyword   value
+
+Match exec "true"
+  User nobody
+"""
+
+
+class SshConfigDocumentTestCase(TestCase):
+    def test_round_trip(self) -> None:
+        document = SshConfigDocument(DUMMY_SSH_CONFIG)
+        self.assertFalse(document.modified)
+        self.assertEqual(DUMMY_SSH_CONFIG, document.render())
+        self.assertEqual(["gitlab.com", "github.com"], document.hosts)
+        self.assertEqual("~/.ssh/gitlab", document.get("gitlab.com", SshKeyword.IdentityFile))
+
+    def test_replace_value(self) -> None:
+        document = SshConfigDocument(b"Host github.com\n    IdentityFile ~/.ssh/old\n    User git\n")
+        self.assertFalse(document.set("github.com", SshKeyword.IdentityFile, "~/.ssh/old"))
+        self.assertTrue(document.set("github.com", SshKeyword.IdentityFile, "~/.ssh/my key"))
+        self.assertEqual(b'Host github.com\n    IdentityFile "~/.ssh/my key"\n    User git\n', document.render())
+
+    def test_insert_directive(self) -> None:
+        document = SshConfigDocument(b"Host github.com\n\tUser git\n\n# next\nHost other\n")
+        document.set("github.com", SshKeyword.IdentityFile, "~/.ssh/link")
+        document.set("github.com", SshKeyword.IdentitiesOnly, "yes")
+        self.assertEqual(
+            b"Host github.com\n\tUser git\n\tIdentityFile ~/.ssh/link\n\tIdentitiesOnly yes\n\n# next\nHost other\n",
+            document.render(),
+        )
+
+    def test_append_block(self) -> None:
+        document = SshConfigDocument(b"Host other\r\n  User me")
+        document.set("github.com", SshKeyword.IdentityFile, "~/.ssh/link")
+        expected = b"Host other\r\n  User me\r\nHost github.com\r\n  IdentityFile ~/.ssh/link\r\n"
+        self.assertEqual(expected, document.render())
+
+        document = SshConfigDocument(b"")
+        document.set("github.com", SshKeyword.IdentityFile, "~/.ssh/link")
+        self.assertEqual(b"Host github.com\n    IdentityFile ~/.ssh/link\n", document.render())
+
+    def test_write(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "config"
+            path.write_bytes(DUMMY_SSH_CONFIG)
+            path.chmod(0o600)
+
+            document = SshConfigDocument.read(path)
+            self.assertFalse(document.write(path))
+
+            document.set("github.com", SshKeyword.IdentityFile, "~/.ssh/link")
+            self.assertTrue(document.write(path))
+            self.assertFalse(document.modified)
+
+            expected = DUMMY_SSH_CONFIG.replace(b"=~/.ssh/old\t\n", b"=~/.ssh/link\t\n")
+            self.assertEqual(expected, path.read_bytes())
+            self.assertEqual(0o600, path.stat().st_mode & 0o777)
+            self.assertEqual(["config"], [entry.name for entry in Path(temp_dir).iterdir()])
+
+    def test_write_symlink(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            (Path(temp_dir) / "dotfiles").mkdir()
+            target = Path(temp_dir) / "dotfiles" / "ssh_config"
+            target.write_bytes(DUMMY_SSH_CONFIG)
+            link = Path(temp_dir) / "config"
+            link.symlink_to(Path("dotfiles") / "ssh_config")
+
+            document = SshConfigDocument.read(link)
+            document.set("github.com", SshKeyword.IdentityFile, "~/.ssh/link")
+            self.assertTrue(document.write(link))
+
+            self.assertTrue(link.is_symlink())
+            self.assertEqual(document.render(), target.read_bytes())
+            self.assertEqual(["ssh_config"], [entry.name for entry in target.parent.iterdir()])
+
+
+if __name__ == "__main__":
+    main()
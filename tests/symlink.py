@@ -1,6 +1,8 @@
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 from tempfile import TemporaryDirectory
+from threading import Event
+from threading import Thread
 from unittest import main
 from unittest import TestCase
 
@@ -74,6 +76,53 @@ class SymlinkTestCase(TestCase):
             self.assertEqual(target_file, link.target)
             self.assertEqual(test_content, get_file_content(link.path))
 
+    def test_point(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir).resolve()
+            first, second = root / "first", root / "second"
+            first.touch()
+            second.touch()
+            link_file = root / "link"
+
+            self.assertEqual(first, Symlink.point(link_file, first).target)
+            self.assertEqual(second, Symlink.point(link_file, second).target)
+
+            second.unlink()
+            self.assertEqual(first, Symlink.point(link_file, first).target)
+
+            with self.assertRaises(ValueError):
+                Symlink.point(first, second)
+
+    def test_atomic_switch(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir).resolve()
+            targets = [root / "first", root / "second"]
+            for target in targets:
+                target.touch()
+            link = Symlink.make(path=root / "link", to=targets[0])
+
+            stopped = Event()
+            failures = []
+
+            def resolve() -> None:
+                while not stopped.is_set():
+                    try:
+                        link.target
+                    except OSError as error:
+                        failures.append(error)
+
+            reader = Thread(target=resolve)
+            reader.start()
+            try:
+                for index in range(2000):
+                    link.switch(targets[index % 2])
+            finally:
+                stopped.set()
+                reader.join()
+
+            self.assertEqual([], failures)
+            self.assertEqual(sorted(["first", "second", "link"]), sorted(path.name for path in root.iterdir()))
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,67 @@
+from threading import current_thread
+from threading import Event
+from time import monotonic
+from unittest import main
+from unittest import TestCase
+
+from github_tools.internal.account import Account
+from github_tools.internal.validation import check_accounts
+
+
+def make_accounts(count: int) -> list[Account]:
+    return [Account.create(f"account-{index}", __file__ if index % 2 else "/fake/cert") for index in range(count)]
+
+
+class ValidationTestCase(TestCase):
+    def test_results(self) -> None:
+        accounts = make_accounts(50)
+        results = dict(check_accounts(accounts, workers=4))
+        self.assertEqual(set(accounts), set(results))
+        self.assertTrue(all(results[account] == account.is_valid() for account in accounts))
+
+    def test_empty(self) -> None:
+        self.assertEqual([], list(check_accounts([])))
+
+    def test_timeout(self) -> None:
+        release = Event()
+
+        def check(account: Account) -> bool:
+            if account.name == "account-0":
+                release.wait()
+            return True
+
+        started = monotonic()
+        results = dict(check_accounts(make_accounts(10), check, workers=1, timeout=0.2))
+        release.set()
+
+        self.assertLess(monotonic() - started, 2)
+        self.assertEqual([None], [result for result in results.values() if result is not True])
+        self.assertEqual(10, len(results))
+
+    def test_spawn_limit(self) -> None:
+        release = Event()
+        threads = set()
+
+        def check(account: Account) -> bool:
+            threads.add(current_thread())
+            release.wait()
+            return True
+
+        started = monotonic()
+        results = list(check_accounts(make_accounts(20), check, workers=2, timeout=0.05))
+        release.set()
+
+        self.assertLess(monotonic() - started, 2)
+        self.assertEqual([None] * 20, [result for _, result in results])
+        self.assertEqual(4, len(threads))
+
+    def test_error(self) -> None:
+        def check(account: Account) -> bool:
+            raise RuntimeError("check failed")
+
+        with self.assertRaises(RuntimeError):
+            list(check_accounts(make_accounts(3), check))
+
+
+if __name__ == "__main__":
+    main()